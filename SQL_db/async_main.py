@@ -0,0 +1,109 @@
+from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Literal, Optional
+import logging
+import os
+
+from models import Base, Event, EventCreate
+from queries import (
+    EXPORT_CHUNK_SIZE, MAX_PAGE_SIZE, InvalidQuery, decode_cursor, events_query, ndjson_chunk, page_response,
+    parse_fields
+)
+
+# Same API as main.py on an asyncio engine (asyncpg): requests wait on the database without holding a thread.
+# Run with: uvicorn async_main:app
+
+# ---------------- Logging Setup ----------------
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger("sql-db-async")
+
+# ---------------- Database Config ----------------
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", "postgresql+asyncpg://postgres@127.0.0.1:5432/drishti_db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+if ASYNC_DATABASE_URL.startswith("sqlite"):
+    engine = create_async_engine(ASYNC_DATABASE_URL)
+else:
+    engine = create_async_engine(
+        ASYNC_DATABASE_URL, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_pre_ping=True
+    )
+SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+async def get_db():
+    async with SessionLocal() as db:
+        yield db
+
+# ---------------- FastAPI App ----------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        logger.info("Database tables created (if not exist).")
+    except Exception as e:
+        logger.error(f"Failed to create tables: {e}")
+    try:
+        yield
+    finally:
+        await engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.post("/events/")
+async def create_event(event: EventCreate, db: AsyncSession = Depends(get_db)):
+    try:
+        db_event = event.to_event()
+        db.add(db_event)
+        await db.commit()  # expire_on_commit=False keeps the generated fields; no refresh round-trip
+        logger.info(f"Event created successfully: {db_event.event_id}")
+        return {"event_id": db_event.event_id, **event.dict()}
+    except Exception as e:
+        logger.error(f"Failed to create event: {e}")
+        raise HTTPException(status_code=500, detail="Error creating event")
+
+async def export_events(fields, filters, order, after=None):
+    """NDJSON of every matching event, read in keyset chunks so no query holds the whole result."""
+    while True:
+        async with SessionLocal() as db:
+            result = await db.execute(events_query(fields, after=after, order=order, limit=EXPORT_CHUNK_SIZE, **filters))
+            rows = result.all()
+        if not rows:
+            return
+        yield ndjson_chunk(rows)
+        if len(rows) < EXPORT_CHUNK_SIZE:
+            return
+        after = (rows[-1].timestamp, rows[-1].event_id)
+
+@app.get("/events/")
+async def read_events(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    location: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="comma-separated columns; timestamp and event_id are always included"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page, with the same filters and order"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    order: Literal["asc", "desc"] = "desc",
+    format: Literal["json", "ndjson"] = "json",
+    db: AsyncSession = Depends(get_db)
+):
+    """One page of events ordered by (timestamp, event_id); format=ndjson streams every match from the cursor on."""
+    try:
+        columns = parse_fields(fields)
+        after = decode_cursor(cursor) if cursor else None
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    filters = {"start": start, "end": end, "location": location}
+
+    if format == "ndjson":
+        return StreamingResponse(export_events(columns, filters, order, after), media_type="application/x-ndjson")
+
+    try:
+        result = await db.execute(events_query(columns, after=after, order=order, limit=limit + 1, **filters))
+        return page_response(result.all(), limit)
+    except Exception as e:
+        logger.error(f"Failed to fetch events: {e}")
+        raise HTTPException(status_code=500, detail="Error fetching events")
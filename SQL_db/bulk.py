@@ -0,0 +1,118 @@
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+from sqlalchemy import Uuid, bindparam, column, update, values
+
+from models import Event, Image, Summary
+from queries import as_naive_utc
+
+# Bulk writes into the models.py schema (events, images, summaries)
+
+# ---------------- Config ----------------
+MAX_BULK_EVENTS = 5000
+
+events_table = Event.__table__
+images_table = Image.__table__
+summaries_table = Summary.__table__
+
+# ---------------- Pydantic Schema ----------------
+class BulkImage(BaseModel):
+    image_id: Optional[uuid.UUID] = None
+    blob_url: Optional[str] = None
+    timestamp: Optional[datetime] = None  # defaults to the event's
+    camera_id: Optional[str] = None
+    motion_score: Optional[float] = None
+    is_anomaly_frame: bool = False
+
+class BulkSummary(BaseModel):
+    summary_id: Optional[uuid.UUID] = None
+    summary_text: str
+    generated_at: Optional[datetime] = None
+    model_used: Optional[str] = None
+
+class BulkEvent(BaseModel):
+    """An event with its images and summary; ids left out are generated here, before the insert."""
+    event_id: Optional[uuid.UUID] = None
+    event_type: Optional[str] = None
+    zone: Optional[str] = None
+    location: Optional[str] = None
+    severity: Optional[str] = None
+    threat_level: Optional[str] = None
+    timestamp: datetime
+    details_json: Optional[dict] = None
+    images: List[BulkImage] = Field(default_factory=list)
+    summary: Optional[BulkSummary] = None
+
+# ---------------- Rows ----------------
+def bulk_rows(events: List[BulkEvent]):
+    """(event rows, image rows, summary rows, [(event_id, summary_id)] links) with every id assigned."""
+    event_rows, image_rows, summary_rows, links = [], [], [], []
+    for event in events:
+        event_id = event.event_id or uuid.uuid4()
+        timestamp = as_naive_utc(event.timestamp)
+        event_rows.append({
+            "event_id": event_id,
+            "event_type": event.event_type,
+            "zone": event.zone,
+            "location": event.location,
+            "severity": event.severity,
+            "threat_level": event.threat_level,
+            "timestamp": timestamp,
+            "details_json": event.details_json,
+            "summary_id": None,  # linked once the summary row exists
+        })
+        for image in event.images:
+            image_rows.append({
+                "image_id": image.image_id or uuid.uuid4(),
+                "event_id": event_id,
+                "blob_url": image.blob_url,
+                "timestamp": as_naive_utc(image.timestamp) or timestamp,
+                "camera_id": image.camera_id,
+                "motion_score": image.motion_score,
+                "is_anomaly_frame": image.is_anomaly_frame,
+            })
+        if event.summary is not None:
+            summary_id = event.summary.summary_id or uuid.uuid4()
+            summary_rows.append({
+                "summary_id": summary_id,
+                "summary_text": event.summary.summary_text,
+                "generated_at": as_naive_utc(event.summary.generated_at) or datetime.utcnow(),
+                "model_used": event.summary.model_used,
+                "event_id": event_id,
+                "source_event_id": str(event_id),
+            })
+            links.append((event_id, summary_id))
+    return event_rows, image_rows, summary_rows, links
+
+# ---------------- Write ----------------
+def write_bulk(conn, event_rows, image_rows, summary_rows, links):
+    """Four statements in the caller's transaction, whatever the batch size.
+
+    events and summaries reference each other, so events go in with summary_id NULL
+    and are linked by one UPDATE ... FROM (VALUES ...) after the summaries exist
+    (an executemany UPDATE on databases without that syntax, e.g. SQLite).
+    The executemany inserts are sent as multi-row INSERTs (SQLAlchemy insertmanyvalues);
+    no RETURNING is needed since every id is already known.
+    """
+    if event_rows:
+        conn.execute(events_table.insert(), event_rows)
+    if image_rows:
+        conn.execute(images_table.insert(), image_rows)
+    if summary_rows:
+        conn.execute(summaries_table.insert(), summary_rows)
+    if links and conn.dialect.name == "postgresql":
+        link = values(column("event_id", Uuid), column("summary_id", Uuid), name="link").data(links)
+        conn.execute(
+            update(events_table)
+            .where(events_table.c.event_id == link.c.event_id)
+            .values(summary_id=link.c.summary_id)
+        )
+    elif links:
+        conn.execute(
+            update(events_table)
+            .where(events_table.c.event_id == bindparam("link_event_id"))
+            .values(summary_id=bindparam("link_summary_id")),
+            [{"link_event_id": event_id, "link_summary_id": summary_id} for event_id, summary_id in links]
+        )
@@ -1,82 +1,132 @@
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy import create_engine, Column, String, TIMESTAMP
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.ext.declarative import declarative_base
+from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker, Session
-from pydantic import BaseModel
 from datetime import datetime
-import uuid
+from typing import List, Literal, Optional
+import logging
+import os
+
+from bulk import MAX_BULK_EVENTS, BulkEvent, bulk_rows, write_bulk
+from models import Base, Event, EventCreate
+from queries import (
+    EXPORT_CHUNK_SIZE, MAX_PAGE_SIZE, InvalidQuery, decode_cursor, events_query, ndjson_chunk, page_response,
+    parse_fields
+)
+
+# ---------------- Logging Setup ----------------
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger("sql-db")
 
 # ---------------- Database Config ----------------
-DATABASE_URL = "postgresql://postgres@127.0.0.1:5432/drishti_db"
-print(f"[INFO] Connecting to database at {DATABASE_URL}")
+DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://postgres@127.0.0.1:5432/drishti_db")
+logger.info(f"Connecting to database at {DATABASE_URL}")
 
 try:
     engine = create_engine(DATABASE_URL)
     SessionLocal = sessionmaker(bind=engine)
-    Base = declarative_base()
-    print("[INFO] SQLAlchemy engine and session created successfully.")
+    logger.info("SQLAlchemy engine and session created successfully.")
 except Exception as e:
-    print(f"[ERROR] Failed to initialize SQLAlchemy engine: {e}")
+    logger.error(f"Failed to initialize SQLAlchemy engine: {e}")
 
 def get_db():
-    print("[DEBUG] Opening DB session...")
     db = SessionLocal()
     try:
         yield db
     finally:
-        print("[DEBUG] Closing DB session...")
         db.close()
 
-# ---------------- SQLAlchemy Model ----------------
-class Event(Base):
-    __tablename__ = "events"
-
-    event_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    title = Column(String, nullable=False)
-    location = Column(String, nullable=False)
-    timestamp = Column(TIMESTAMP, nullable=False)
-
-# ---------------- Pydantic Schema ----------------
-class EventCreate(BaseModel):
-    title: str
-    location: str
-    timestamp: datetime
-
 # ---------------- FastAPI App ----------------
 app = FastAPI()
 
 # Create DB tables at startup
 @app.on_event("startup")
 def startup():
-    print("[INFO] Starting up application...")
+    logger.info("Starting up application...")
     try:
         Base.metadata.create_all(bind=engine)
-        print("[INFO] Database tables created (if not exist).")
+        logger.info("Database tables created (if not exist).")
     except Exception as e:
-        print(f"[ERROR] Failed to create tables: {e}")
+        logger.error(f"Failed to create tables: {e}")
 
 @app.post("/events/")
 def create_event(event: EventCreate, db: Session = Depends(get_db)):
-    print(f"[INFO] Received request to create event: {event}")
     try:
-        db_event = Event(**event.dict())
+        db_event = event.to_event()
         db.add(db_event)
         db.commit()
         db.refresh(db_event)
-        print(f"[INFO] Event created successfully: {db_event.event_id}")
-        return db_event
+        logger.info(f"Event created successfully: {db_event.event_id}")
+        return {"event_id": db_event.event_id, **event.dict()}
     except Exception as e:
-        print(f"[ERROR] Failed to create event: {e}")
+        logger.error(f"Failed to create event: {e}")
         raise HTTPException(status_code=500, detail="Error creating event")
 
+@app.post("/events/bulk")
+def create_events_bulk(events: List[BulkEvent]):
+    """Events with nested images and summaries, written in one transaction."""
+    if len(events) > MAX_BULK_EVENTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_EVENTS} events per request")
+    event_rows, image_rows, summary_rows, links = bulk_rows(events)
+    try:
+        with engine.begin() as conn:
+            write_bulk(conn, event_rows, image_rows, summary_rows, links)
+    except IntegrityError as e:
+        logger.error(f"Bulk insert rejected: {e.orig}")
+        raise HTTPException(status_code=409, detail="Batch conflicts with existing rows; nothing was written")
+    except Exception as e:
+        logger.error(f"Failed to bulk insert events: {e}")
+        raise HTTPException(status_code=500, detail="Error creating events")
+    logger.info(f"Bulk inserted {len(event_rows)} events, {len(image_rows)} images, {len(summary_rows)} summaries")
+    ids = {row["event_id"]: {"event_id": row["event_id"], "image_ids": [], "summary_id": None} for row in event_rows}
+    for row in image_rows:
+        ids[row["event_id"]]["image_ids"].append(row["image_id"])
+    for event_id, summary_id in links:
+        ids[event_id]["summary_id"] = summary_id
+    return {
+        "events": list(ids.values()),
+        "counts": {"events": len(event_rows), "images": len(image_rows), "summaries": len(summary_rows)},
+    }
+
+def export_events(fields, filters, order, after=None):
+    """NDJSON of every matching event, read in keyset chunks so no query holds the whole result."""
+    while True:
+        with SessionLocal() as db:
+            rows = db.execute(events_query(fields, after=after, order=order, limit=EXPORT_CHUNK_SIZE, **filters)).all()
+        if not rows:
+            return
+        yield ndjson_chunk(rows)
+        if len(rows) < EXPORT_CHUNK_SIZE:
+            return
+        after = (rows[-1].timestamp, rows[-1].event_id)
+
 @app.get("/events/")
-def read_events(db: Session = Depends(get_db)):
-    print("[INFO] Fetching all events from database...")
+def read_events(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    location: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="comma-separated columns; timestamp and event_id are always included"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page, with the same filters and order"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    order: Literal["asc", "desc"] = "desc",
+    format: Literal["json", "ndjson"] = "json",
+    db: Session = Depends(get_db)
+):
+    """One page of events ordered by (timestamp, event_id); format=ndjson streams every match from the cursor on."""
+    try:
+        columns = parse_fields(fields)
+        after = decode_cursor(cursor) if cursor else None
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    filters = {"start": start, "end": end, "location": location}
+
+    if format == "ndjson":
+        return StreamingResponse(export_events(columns, filters, order, after), media_type="application/x-ndjson")
+
     try:
-        events = db.query(Event).all()
-        print(f"[INFO] Retrieved {len(events)} events.")
-        return events
+        rows = db.execute(events_query(columns, after=after, order=order, limit=limit + 1, **filters)).all()
+        return page_response(rows, limit)
     except Exception as e:
-        print(f"[ERROR] Failed to fetch events: {e}")
+        logger.error(f"Failed to fetch events: {e}")
         raise HTTPException(status_code=500, detail="Error fetching events")
@@ -0,0 +1,183 @@
+import argparse
+import functools
+from datetime import date, datetime
+
+from sqlalchemy import Column, Integer, MetaData, Table, Text, TIMESTAMP, create_engine, inspect, select, text
+
+from models import Base
+from query import DATABASE_URL
+
+# Versioned schema changes for the tables in models.py. Applied versions are recorded in
+# schema_migrations, so running this again only applies what is missing.
+#   python migrations.py                      # indexes
+#   python migrations.py --partition          # plus monthly partitions of events/images (PostgreSQL)
+#   python migrations.py --create-partitions  # run monthly (cron) to add upcoming partitions
+
+# ---------------- Config ----------------
+PARTITIONED_TABLES = {"events": "event_id", "images": "image_id"}  # table -> primary key column
+PARTITION_MONTHS_AHEAD = 3
+
+migration_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", Text, nullable=False),
+    Column("applied_at", TIMESTAMP, nullable=False),
+)
+
+# ---------------- Helpers ----------------
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+def _create_indexes(conn, table_name: str):
+    """Declared indexes of `table_name`, skipping any whose columns the existing table does not have."""
+    columns = {column["name"] for column in inspect(conn).get_columns(table_name)}
+    for index in Base.metadata.tables[table_name].indexes:
+        missing = [column.name for column in index.columns if column.name not in columns]
+        if missing:
+            print(f"[WARN] Skipping {index.name}: {table_name} has no column {', '.join(missing)}")
+            continue
+        index.create(conn, checkfirst=True)
+
+def is_partitioned(conn, table_name: str) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :name"),
+        {"name": table_name}
+    ).first() is not None
+
+def create_month_partitions(conn, table_name: str, first: date, last: date):
+    """One partition per calendar month from `first` up to and including `last`'s month.
+
+    Rows for that month already sitting in <table>_default are moved into the new
+    partition before it is attached; PostgreSQL refuses to attach it otherwise.
+    """
+    month = date(first.year, first.month, 1)
+    while month <= last:
+        upper = _add_months(month, 1)
+        partition = f"{table_name}_y{month.year}m{month.month:02d}"
+        if conn.execute(text("SELECT to_regclass(:name)"), {"name": partition}).scalar() is None:
+            bounds = {"lower": month, "upper": upper}
+            conn.execute(text(f"CREATE TABLE {partition} (LIKE {table_name} INCLUDING DEFAULTS)"))
+            conn.execute(text(
+                f'WITH moved AS (DELETE FROM {table_name}_default WHERE "timestamp" >= :lower AND "timestamp" < :upper '
+                f"RETURNING *) INSERT INTO {partition} SELECT * FROM moved"
+            ), bounds)
+            conn.execute(text(
+                f"ALTER TABLE {table_name} ATTACH PARTITION {partition} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+            ))
+        month = upper
+
+def _outbound_foreign_keys(conn, table_name: str):
+    """Foreign keys of `table_name` that can survive partitioning: those pointing at unpartitioned tables."""
+    return [fk for fk in inspect(conn).get_foreign_keys(table_name) if fk["referred_table"] not in PARTITIONED_TABLES]
+
+# ---------------- Migrations ----------------
+def add_indexes(conn):
+    """Secondary indexes declared on the models.py tables (zone+timestamp, camera_id+timestamp, FK columns)."""
+    for table_name in Base.metadata.tables:
+        if inspect(conn).has_table(table_name):
+            _create_indexes(conn, table_name)
+
+def partition_by_month(conn, months_ahead: int = PARTITION_MONTHS_AHEAD):
+    """Rebuild events and images as tables range-partitioned by month on "timestamp".
+
+    The data is copied inside this transaction, so run it in a maintenance window.
+    A partitioned table's primary key must contain the partition key, so the keys
+    become (id, timestamp), and event_id alone can no longer be the target of a
+    foreign key. The foreign keys images.event_id -> events and summaries.event_id
+    -> events are therefore dropped, not re-created. Foreign keys to unpartitioned
+    tables (events.summary_id -> summaries) are re-created on the new table.
+    Rows with a NULL timestamp cannot be migrated. Rows outside every monthly
+    partition land in <table>_default.
+    """
+    if conn.dialect.name != "postgresql":
+        raise RuntimeError("Partitioning needs PostgreSQL")
+    this_month = date.today().replace(day=1)
+    for table_name, key in PARTITIONED_TABLES.items():
+        if is_partitioned(conn, table_name):
+            continue
+        old = f"{table_name}_unpartitioned"
+        conn.execute(text(f"ALTER TABLE {table_name} RENAME TO {old}"))
+        foreign_keys = _outbound_foreign_keys(conn, old)  # LIKE does not copy foreign keys
+        conn.execute(text(f'CREATE TABLE {table_name} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")'))
+        conn.execute(text(f"CREATE TABLE {table_name}_default PARTITION OF {table_name} DEFAULT"))
+        oldest = conn.execute(text(f'SELECT min("timestamp") FROM {old}')).scalar()
+        first = min(oldest.date(), this_month) if oldest else this_month
+        create_month_partitions(conn, table_name, first, _add_months(this_month, months_ahead))
+        conn.execute(text(f"INSERT INTO {table_name} SELECT * FROM {old}"))
+        conn.execute(text(f"DROP TABLE {old} CASCADE"))  # drops the inbound foreign keys; see the docstring
+        conn.execute(text(
+            f'ALTER TABLE {table_name} ADD CONSTRAINT {table_name}_pkey PRIMARY KEY ({key}, "timestamp")'
+        ))
+        for fk in foreign_keys:
+            name = f"{table_name}_{'_'.join(fk['constrained_columns'])}_fkey"
+            columns, referred = ", ".join(fk["constrained_columns"]), ", ".join(fk["referred_columns"])
+            conn.execute(text(
+                f"ALTER TABLE {table_name} ADD CONSTRAINT {name} "
+                f"FOREIGN KEY ({columns}) REFERENCES {fk['referred_table']} ({referred})"
+            ))
+        _create_indexes(conn, table_name)  # created on the parent, inherited by every partition
+
+def add_summary_source_event_id(conn):
+    """summaries.source_event_id, so summaries of events with no `events` row keep their event's id."""
+    if not inspect(conn).has_table("summaries"):
+        return
+    if "source_event_id" not in {column["name"] for column in inspect(conn).get_columns("summaries")}:
+        conn.execute(text("ALTER TABLE summaries ADD COLUMN source_event_id TEXT"))
+    _create_indexes(conn, "summaries")
+
+MIGRATIONS = [
+    (1, "secondary indexes", add_indexes),
+    (3, "summaries.source_event_id", add_summary_source_event_id),
+]
+PARTITION_MIGRATION = (2, "monthly partitions for events and images", partition_by_month)  # opt-in
+
+# ---------------- Runner ----------------
+def upgrade(engine, *, partition: bool = False, months_ahead: int = PARTITION_MONTHS_AHEAD):
+    """Apply every migration not yet recorded, each in its own transaction; returns the versions applied."""
+    migration_metadata.create_all(engine)
+    pending = list(MIGRATIONS)
+    if partition:
+        version, name, migrate = PARTITION_MIGRATION
+        pending.append((version, name, functools.partial(migrate, months_ahead=months_ahead)))
+
+    with engine.connect() as conn:
+        done = set(conn.execute(select(schema_migrations.c.version)).scalars())
+    applied = []
+    for version, name, migrate in sorted(pending, key=lambda m: m[0]):
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(version=version, name=name, applied_at=datetime.utcnow()))
+        print(f"[INFO] Applied migration {version}: {name}")
+        applied.append(version)
+    return applied
+
+def ensure_partitions(engine, months_ahead: int = PARTITION_MONTHS_AHEAD):
+    """Create the coming months' partitions before rows for them arrive (otherwise they go to _default).
+
+    Rows that did reach _default for those months are moved into the new partitions.
+    """
+    this_month = date.today().replace(day=1)
+    with engine.begin() as conn:
+        for table_name in PARTITIONED_TABLES:
+            if is_partitioned(conn, table_name):
+                create_month_partitions(conn, table_name, this_month, _add_months(this_month, months_ahead))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply schema migrations to the models.py tables.")
+    parser.add_argument("--url", default=DATABASE_URL)
+    parser.add_argument("--partition", action="store_true", help="also partition events and images by month")
+    parser.add_argument("--create-partitions", action="store_true", help="only add upcoming monthly partitions")
+    parser.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    if args.create_partitions:
+        ensure_partitions(engine, args.months_ahead)
+    else:
+        Base.metadata.create_all(engine)
+        upgrade(engine, partition=args.partition, months_ahead=args.months_ahead)
@@ -0,0 +1,101 @@
+from sqlalchemy import Column, Text, Boolean, Float, ForeignKey, Index, JSON, TIMESTAMP
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
+from pydantic import BaseModel
+from datetime import datetime
+import uuid
+
+# The one schema: the sync (main.py) and async (async_main.py) services, bulk.py,
+# migrations.py and the query.py setup script all use these tables
+Base = declarative_base()
+
+# JSONB on PostgreSQL (JSON on the SQLite stand-in); None is stored as SQL NULL, not 'null'
+JSONColumn = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+
+# ---------------- SQLAlchemy Models ----------------
+# === Table 1: Events ===
+class Event(Base):
+    __tablename__ = "events"
+    __table_args__ = (
+        # Keyset pagination walks (timestamp, event_id), which also serves plain time ranges
+        Index("ix_events_timestamp_event_id", "timestamp", "event_id"),
+        Index("ix_events_location_timestamp", "location", "timestamp"),
+        Index("ix_events_zone_timestamp", "zone", "timestamp"),
+        Index("ix_events_summary_id", "summary_id"),
+    )
+
+    event_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    event_type = Column(Text)
+    zone = Column(Text)
+    location = Column(Text)
+    severity = Column(Text)
+    threat_level = Column(Text)
+    timestamp = Column(TIMESTAMP)
+    details_json = Column(JSONColumn)
+    summary_id = Column(UUID(as_uuid=True), ForeignKey("summaries.summary_id"), nullable=True)
+
+    # events.summary_id and summaries.event_id are two separate many-to-one links, not one relationship's two sides
+    summary = relationship("Summary", uselist=False, foreign_keys=[summary_id])
+    images = relationship("Image", back_populates="event")
+
+
+# === Table 2: Summaries ===
+class Summary(Base):
+    __tablename__ = "summaries"
+    __table_args__ = (
+        Index("ix_summaries_event_id", "event_id"),
+        Index("ix_summaries_source_event_id", "source_event_id"),
+    )
+
+    summary_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    summary_text = Column(Text)
+    generated_at = Column(TIMESTAMP)
+    model_used = Column(Text)
+    event_id = Column(UUID(as_uuid=True), ForeignKey("events.event_id"))
+    # The summarised event's id as sent, also when it has no `events` row (the combiner's "combined_<hex>" ids)
+    source_event_id = Column(Text)
+
+    event = relationship("Event", foreign_keys=[event_id])
+
+
+# === Table 3: Images ===
+class Image(Base):
+    __tablename__ = "images"
+    __table_args__ = (
+        Index("ix_images_event_id", "event_id"),
+        Index("ix_images_camera_id_timestamp", "camera_id", "timestamp"),
+    )
+
+    image_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    event_id = Column(UUID(as_uuid=True), ForeignKey("events.event_id"))
+    blob_url = Column(Text)
+    timestamp = Column(TIMESTAMP)
+    camera_id = Column(Text)
+    motion_score = Column(Float)
+    is_anomaly_frame = Column(Boolean)
+
+    event = relationship("Event", back_populates="images")
+
+
+# === Table 4: Cameras ===
+class Camera(Base):
+    __tablename__ = "cameras"
+    __table_args__ = (
+        Index("ix_cameras_zone_id", "zone_id"),
+    )
+
+    camera_id = Column(Text, primary_key=True)
+    zone_id = Column(Text)
+    location_meta = Column(JSONColumn)
+    active = Column(Boolean)
+
+# ---------------- Pydantic Schema ----------------
+class EventCreate(BaseModel):
+    """POST /events/ body, the endpoint's original contract; `title` is stored as events.event_type."""
+    title: str
+    location: str
+    timestamp: datetime
+
+    def to_event(self) -> Event:
+        return Event(event_type=self.title, location=self.location, timestamp=self.timestamp)
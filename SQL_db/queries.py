@@ -0,0 +1,98 @@
+import base64
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import select, tuple_
+
+from models import Event
+
+# ---------------- Config ----------------
+EVENT_FIELDS = tuple(column.name for column in Event.__table__.columns)
+KEY_FIELDS = ("timestamp", "event_id")  # always returned: the cursor is built from them
+MAX_PAGE_SIZE = 1000
+EXPORT_CHUNK_SIZE = 1000
+
+class InvalidQuery(ValueError):
+    """A listing parameter (fields, cursor) that cannot be used."""
+
+# ---------------- Parameters ----------------
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Comma-separated column names -> columns to select, key columns first; None means all."""
+    if not fields:
+        return list(EVENT_FIELDS)
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = sorted(set(requested) - set(EVENT_FIELDS))
+    if unknown:
+        raise InvalidQuery(f"Unknown fields {', '.join(unknown)}; expected any of {', '.join(EVENT_FIELDS)}")
+    return list(KEY_FIELDS) + [name for name in dict.fromkeys(requested) if name not in KEY_FIELDS]
+
+def as_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """events.timestamp is TIMESTAMP WITHOUT TIME ZONE holding UTC; compare like with like."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def encode_cursor(row) -> str:
+    key = [row.timestamp.isoformat(), str(row.event_id)]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, event_id = json.loads(base64.urlsafe_b64decode(padded))
+        return as_naive_utc(datetime.fromisoformat(timestamp)), uuid.UUID(event_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidQuery(f"Invalid cursor: {e}")
+
+# ---------------- Query ----------------
+def events_query(fields: List[str], *, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 location: Optional[str] = None, after=None, order: str = "desc", limit: int = 100):
+    """One keyset page: rows strictly after the `after` key in (timestamp, event_id) order.
+
+    `start` is inclusive and `end` exclusive. The seek is an index range scan on
+    ix_events_timestamp_event_id, so every page costs the same however deep it is.
+    Events without a timestamp have no place in that order and are not listed.
+    """
+    stmt = select(*(Event.__table__.c[name] for name in fields)).where(Event.timestamp.isnot(None))
+    if start is not None:
+        stmt = stmt.where(Event.timestamp >= as_naive_utc(start))
+    if end is not None:
+        stmt = stmt.where(Event.timestamp < as_naive_utc(end))
+    if location is not None:
+        stmt = stmt.where(Event.location == location)
+
+    key = tuple_(Event.timestamp, Event.event_id)
+    if order == "desc":
+        if after is not None:
+            stmt = stmt.where(key < tuple_(*after))
+        stmt = stmt.order_by(Event.timestamp.desc(), Event.event_id.desc())
+    else:
+        if after is not None:
+            stmt = stmt.where(key > tuple_(*after))
+        stmt = stmt.order_by(Event.timestamp.asc(), Event.event_id.asc())
+    return stmt.limit(limit)
+
+def row_dict(row) -> dict:
+    """JSON-ready dict of a result row (ISO timestamps, string UUIDs)."""
+    out = {}
+    for name, value in row._mapping.items():
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, uuid.UUID):
+            value = str(value)
+        out[name] = value
+    return out
+
+def page_response(rows, limit: int) -> dict:
+    """`rows` was fetched with limit + 1; the extra row only says whether another page exists."""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": [row_dict(row) for row in rows],
+        "next_cursor": encode_cursor(rows[-1]) if has_more else None,
+    }
+
+def ndjson_chunk(rows) -> str:
+    return "".join(json.dumps(row_dict(row)) + "\n" for row in rows)
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+# main.py connects at import time; point it at a scratch SQLite file first
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/events_test.db"
+
+from fastapi.testclient import TestClient
+
+import main
+from models import Event
+
+# ---------------- Fixtures ----------------
+def seed_events():
+    """Five timestamped events interleaved with NULL-timestamp ones; returns the timestamped ids."""
+    start = datetime(2026, 1, 1)
+    rows, dated = [], []
+    for i in range(5):
+        event_id = uuid.uuid4()
+        dated.append(str(event_id))
+        rows.append({"event_id": event_id, "location": "Gate", "timestamp": start + timedelta(minutes=i)})
+        rows.append({"event_id": uuid.uuid4(), "location": "Gate", "timestamp": None})
+    with main.engine.begin() as conn:
+        conn.execute(Event.__table__.delete())
+        conn.execute(Event.__table__.insert(), rows)
+    return dated
+
+# ---------------- Tests ----------------
+def test_pages_skip_null_timestamps():
+    with TestClient(main.app) as client:
+        dated = seed_events()
+        # SQLite sorts NULLs first ascending, PostgreSQL first descending; cover both
+        for order in ("desc", "asc"):
+            seen, cursor = [], None
+            while True:
+                params = {"limit": 2, "order": order, **({"cursor": cursor} if cursor else {})}
+                resp = client.get("/events/", params=params)
+                assert resp.status_code == 200, resp.text
+                page = resp.json()
+                seen += [item["event_id"] for item in page["items"]]
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            assert sorted(seen) == sorted(dated)
+
+def test_ndjson_export_skips_null_timestamps(monkeypatch):
+    monkeypatch.setattr(main, "EXPORT_CHUNK_SIZE", 2)  # several chunks, so the export resumes from cursors
+    with TestClient(main.app) as client:
+        dated = seed_events()
+        # SQLite sorts NULLs first ascending, PostgreSQL first descending; cover both
+        for order in ("desc", "asc"):
+            resp = client.get("/events/", params={"format": "ndjson", "order": order})
+            assert resp.status_code == 200
+            lines = [line for line in resp.text.splitlines() if line]
+            assert len(lines) == len(dated)
@@ -0,0 +1,79 @@
+import argparse
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # backend/, home of the shared `common` package
+from common.db import create_db_engine
+from persistence import event_rows, events_table, images_table, metadata, write_batch
+
+# ----------- Synthetic Events -----------
+def synthetic_events(count: int):
+    now = datetime.utcnow().isoformat() + "Z"
+    rows = []
+    for i in range(count):
+        anomaly_event = {
+            "event_id": f"anomaly_{i:08x}",
+            "status": "threat_detected",
+            "threats": [{"label": "smoke", "confidence": 0.75}],
+            "message": "Verified Threat(s): smoke",
+            "severity": "medium",
+            "dispatch_type": "fire",
+            "safe": False,
+            "timestamp": now,
+            "camera_id": f"CAM{i % 50:03d}",
+            "location": "Main Gate",
+            "zone_id": "ZoneA",
+            "source": "anomaly-agent-v1.2",
+            "model_version": "vertex-smoke-v3.1",
+        }
+        rows.append(event_rows(anomaly_event, motion_score=12.5, has_image=True))
+    return rows
+
+def _reset(engine):
+    with engine.begin() as conn:
+        conn.execute(images_table.delete())
+        conn.execute(events_table.delete())
+
+# ----------- Strategies -----------
+def per_row_commit(engine, rows):
+    for row in rows:
+        write_batch(engine, [row])
+
+def batched(engine, rows, batch_size: int):
+    for i in range(0, len(rows), batch_size):
+        write_batch(engine, rows[i:i + batch_size])
+
+# ----------- Main -----------
+def main():
+    parser = argparse.ArgumentParser(description="Anomaly event insert throughput: per-row commit vs batched write-behind flushes.")
+    parser.add_argument("--url", help="database URL (default: a temporary SQLite file); PostgreSQL tables must already exist")
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, action="append", help="flush size to try (repeatable; default 50, 500)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{Path(tmp) / 'bench.db'}"
+        engine = create_db_engine(url, pool_size=5, max_overflow=0)
+        if engine.dialect.name == "sqlite":
+            metadata.create_all(engine)
+
+        print(f"{'strategy':>16} {'events':>8} {'seconds':>9} {'events/s':>10}")
+        runs = [("per-row commit", lambda rows: per_row_commit(engine, rows))]
+        for size in args.batch_size or [50, 500]:
+            runs.append((f"batch {size}", lambda rows, size=size: batched(engine, rows, size)))
+
+        for label, run in runs:
+            rows = synthetic_events(args.events)
+            _reset(engine)
+            start = time.perf_counter()
+            run(rows)
+            elapsed = time.perf_counter() - start
+            print(f"{label:>16} {len(rows):>8} {elapsed:>9.2f} {len(rows) / elapsed:>10.0f}")
+        _reset(engine)
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
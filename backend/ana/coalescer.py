@@ -0,0 +1,99 @@
+import asyncio
+import sys
+from collections import deque
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # backend/, home of the shared `common` package
+from common.batching import collect_batch
+
+# ----------- Coalescer -----------
+class RequestCoalescer:
+    """Groups concurrent single-image lookups into one batched backend call.
+
+    A batch is sent once it holds `max_batch_size` items or `max_linger_ms` has passed
+    since its first item arrived. `call_batch(items) -> results` runs on `executor`
+    and returns one entry per item; an entry that is an Exception is raised to that
+    item's waiter only, so one bad image does not fail its batch-mates. Up to
+    `max_concurrent_batches` calls are in flight at once.
+    """
+
+    def __init__(self, call_batch, *, max_batch_size: int, max_linger_ms: float, executor,
+                 max_concurrent_batches: int = 1):
+        self.call_batch = call_batch
+        self.max_batch_size = max_batch_size
+        self.max_linger = max_linger_ms / 1000
+        self.executor = executor
+        self.max_concurrent_batches = max_concurrent_batches
+        self.batches = 0
+        self.items = 0
+        self._sizes = deque(maxlen=512)
+        self._queue = None
+        self._slots = None
+        self._worker = None
+        self._in_flight = set()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, *self._in_flight, return_exceptions=True)
+            self._worker = None
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            batch = await collect_batch(self._queue, self.max_batch_size, self.max_linger)
+            # Waiters that were cancelled (client disconnected) are not sent upstream
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                self._slots.release()
+                continue
+            task = asyncio.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, self.call_batch, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+        self.batches += 1
+        self.items += len(batch)
+        self._sizes.append(len(batch))
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        sizes = list(self._sizes)
+        return {
+            "batches": self.batches,
+            "images": self.items,
+            "queue_depth": self.queue_depth,
+            "avg_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+            "max_batch_size_seen": max(sizes, default=0),
+        }
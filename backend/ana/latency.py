@@ -0,0 +1,31 @@
+import bisect
+
+# ----------- Latency Histogram -----------
+DEFAULT_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class LatencyHistogram:
+    """Cumulative fixed-bucket latency histogram (Prometheus-style `le` buckets, in ms)."""
+
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._counts = [0] * (len(self.buckets_ms) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, latency_ms: float):
+        self._counts[bisect.bisect_left(self.buckets_ms, latency_ms)] += 1
+        self.count += 1
+        self.sum_ms += latency_ms
+
+    def snapshot(self) -> dict:
+        cumulative, running = {}, 0
+        for bound, n in zip(self.buckets_ms, self._counts):
+            running += n
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 2),
+            "avg_ms": round(self.sum_ms / self.count, 2) if self.count else 0.0,
+            "buckets": cumulative,
+        }
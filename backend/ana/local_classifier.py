@@ -0,0 +1,69 @@
+import json
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # backend/, home of the shared `common` package
+from common.decode import reduced_decode
+from vision_backends import THREAT_LABELS
+
+# ----------- Local Classifier -----------
+class OnnxThreatClassifier:
+    """Small multi-label image classifier run on CPU with ONNX Runtime.
+
+    The model takes a float32 NCHW RGB batch in [0, 1] and returns one score per class.
+    Class names come from the model's "labels" metadata (a JSON list); scores are read
+    as logits and squashed with a sigmoid when the metadata has "output": "logits".
+    Only classes listed in THREAT_LABELS are reported.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path: Path, input_size: int = 224, intra_op_threads: int = 1):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("LOCAL_CLASSIFIER=onnx requires the onnxruntime package") from e
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_size = model_input.shape[2] if isinstance(model_input.shape[2], int) else input_size
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if "labels" not in metadata:
+            raise ValueError(f"{model_path} has no 'labels' metadata listing its classes")
+        labels = [label.lower() for label in json.loads(metadata["labels"])]
+        self.threat_columns = [(i, label) for i, label in enumerate(labels) if label in THREAT_LABELS]
+        self.logits = metadata.get("output") == "logits"
+
+    def _preprocess(self, image_bytes: bytes):
+        # The input is stretched to a square, so the shortest side must keep input_size pixels
+        img = reduced_decode(image_bytes, self.input_size, side=min)
+        if img is None:
+            return None
+        img = cv2.resize(img, (self.input_size, self.input_size), interpolation=cv2.INTER_AREA)
+        return img[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+
+    def classify(self, image_bytes: bytes):
+        """[{"label", "confidence"}] for every threat class; None if the image cannot be decoded."""
+        tensor = self._preprocess(image_bytes)
+        if tensor is None:
+            return None
+        scores = self.session.run(None, {self.input_name: tensor[None]})[0][0]
+        if self.logits:
+            scores = 1.0 / (1.0 + np.exp(-scores))
+        return [{"label": label, "confidence": float(scores[i])} for i, label in self.threat_columns]
+
+# ----------- Factory -----------
+def create_local_classifier(kind: str, model_path: Path, *, input_size: int, intra_op_threads: int):
+    if kind == "none":
+        return None
+    if kind == "onnx":
+        return OnnxThreatClassifier(model_path, input_size, intra_op_threads)
+    raise ValueError(f"Unknown local classifier '{kind}', expected 'none' or 'onnx'")
@@ -2,39 +2,133 @@ from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from pydantic import BaseModel
 from datetime import datetime
 from typing import List, Optional
-from contextlib import asynccontextmanager
+import os
+from contextlib import asynccontextmanager, contextmanager
 import concurrent.futures
 import atexit
 import uuid
 import logging
 import asyncio
 import json
+import sys
+import time
+from functools import partial
+from pathlib import Path
 
-# ---------------- Google Cloud Vision ----------------
-from google.cloud import vision
-from google.oauth2 import service_account
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # backend/, home of the shared `common` package
+from common.db import create_db_engine
+from common.write_behind import BufferFull, WriteBehindBuffer
+from coalescer import RequestCoalescer
+from latency import LatencyHistogram
+from local_classifier import create_local_classifier
+from persistence import event_rows, metadata, write_batch
+from vision_backends import MAX_IMAGES_PER_BATCH, VisionError, create_vision_backend
+from vision_cache import PerceptualCache, dhash
+
+# ---------------- Vision Backend ----------------
+# "google" calls Cloud Vision; "fake" answers locally (see vision_backends.FakeVisionBackend)
+VISION_BACKEND = os.getenv("VISION_BACKEND", "google")
 
 # ----------- Replace this path with your actual JSON credentials file path -----------
 GOOGLE_CREDENTIALS_FILE = "./drishti-project-467115-32ad4c1a46b6.json"
-credentials = service_account.Credentials.from_service_account_file(GOOGLE_CREDENTIALS_FILE)
-vision_client = vision.ImageAnnotatorClient(credentials=credentials)
+vision_backend = create_vision_backend(VISION_BACKEND, GOOGLE_CREDENTIALS_FILE)
+
+# ---------------- Result Cache ----------------
+# Near-identical frames from a fixed camera reuse the previous threat list
+CACHE_MAX_DISTANCE = int(os.getenv("VISION_CACHE_MAX_DISTANCE", "6"))  # Hamming bits out of 64
+CACHE_TTL_SECONDS = float(os.getenv("VISION_CACHE_TTL_SECONDS", "30"))
+vision_cache = PerceptualCache(max_distance=CACHE_MAX_DISTANCE, ttl=CACHE_TTL_SECONDS)
+
+# ---------------- Local Classifier Tier ----------------
+# A CPU model screens every frame; only frames it is unsure about go to the cloud backend
+LOCAL_CLASSIFIER = os.getenv("LOCAL_CLASSIFIER", "none")  # "none" sends every frame to the cloud
+LOCAL_MODEL_PATH = Path(os.getenv("LOCAL_MODEL_PATH", "models/threat_classifier.onnx"))
+LOCAL_INPUT_SIZE = int(os.getenv("LOCAL_INPUT_SIZE", "224"))
+LOCAL_WORKERS = int(os.getenv("LOCAL_WORKERS", "1"))
+# Highest local threat score below LOW -> benign, at or above HIGH -> trusted, in between -> escalate
+ESCALATE_LOW = float(os.getenv("LOCAL_ESCALATE_LOW", "0.2"))
+ESCALATE_HIGH = float(os.getenv("LOCAL_ESCALATE_HIGH", "0.85"))
+if not 0.0 <= ESCALATE_LOW <= ESCALATE_HIGH <= 1.0:
+    raise ValueError(f"Escalation band must satisfy 0 <= LOW <= HIGH <= 1, got [{ESCALATE_LOW}, {ESCALATE_HIGH}]")
+local_classifier = create_local_classifier(
+    LOCAL_CLASSIFIER, LOCAL_MODEL_PATH, input_size=LOCAL_INPUT_SIZE, intra_op_threads=1
+)
+
+# ---------------- Persistence ----------------
+# PostgreSQL in deployment (schema from SQL_db/models.py); SQLite file as a local stand-in
+ANOMALY_DB_URL = os.getenv("ANOMALY_DB_URL", "sqlite:///anomaly_events.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "500"))
+PERSIST_FLUSH_MS = float(os.getenv("PERSIST_FLUSH_MS", "200"))
+PERSIST_MAX_BUFFER = int(os.getenv("PERSIST_MAX_BUFFER", "10000"))
+db_engine = create_db_engine(ANOMALY_DB_URL, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
 
 # ---------------- Logging ----------------
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("anomaly-detector")
 
 # ----------- ThreadPool Executor -----------
+# Frame hashing only; Vision calls have their own pool (VISION_EXECUTOR) so cache lookups never wait on the network
 EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=4)
 atexit.register(EXECUTOR.shutdown, wait=False)
+# Separate pool so CPU-bound screening never queues behind blocking Vision calls
+LOCAL_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=LOCAL_WORKERS)
+atexit.register(LOCAL_EXECUTOR.shutdown, wait=False)
+# Single writer thread: flushes are serialised and never compete with Vision calls
+DB_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+atexit.register(DB_EXECUTOR.shutdown, wait=False)
 
 # ----------- Config -----------
 HIGH_CONF_THRESHOLD = 0.8
 MED_CONF_THRESHOLD = 0.5
 
+# ----------- Admission Config -----------
+MAX_PENDING_VISION_CALLS = int(os.getenv("MAX_PENDING_VISION_CALLS", "32"))  # admitted images, before we shed load
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "1"))
+pending_vision_calls = 0  # images admitted and not yet answered; reserved before any await
+
+# ----------- Tier Metrics -----------
+TIER_LATENCY = {"local": LatencyHistogram(), "cloud": LatencyHistogram()}
+TIER_DECISIONS = {"local_benign": 0, "local_threat": 0, "escalated": 0}
+
+# ----------- Batch Annotate Config -----------
+VISION_BATCH_SIZE = min(int(os.getenv("VISION_BATCH_SIZE", "16")), MAX_IMAGES_PER_BATCH)
+VISION_BATCH_LINGER_MS = float(os.getenv("VISION_BATCH_LINGER_MS", "20"))  # wait for batch-mates before calling Vision
+VISION_CONCURRENT_BATCHES = int(os.getenv("VISION_CONCURRENT_BATCHES", "4"))
+# One thread per batch in flight: the blocking Vision round-trips
+VISION_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=VISION_CONCURRENT_BATCHES)
+atexit.register(VISION_EXECUTOR.shutdown, wait=False)
+vision_coalescer = RequestCoalescer(
+    vision_backend.detect_batch,
+    max_batch_size=VISION_BATCH_SIZE,
+    max_linger_ms=VISION_BATCH_LINGER_MS,
+    executor=VISION_EXECUTOR,
+    max_concurrent_batches=VISION_CONCURRENT_BATCHES
+)
+
+persister = WriteBehindBuffer(
+    partial(write_batch, db_engine),
+    executor=DB_EXECUTOR,
+    name="events",
+    max_batch=PERSIST_BATCH_SIZE,
+    flush_interval_ms=PERSIST_FLUSH_MS,
+    max_buffer=PERSIST_MAX_BUFFER
+)
+
 # ---------------- FastAPI Init ----------------
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    yield
+    if db_engine.dialect.name == "sqlite":
+        await asyncio.get_running_loop().run_in_executor(DB_EXECUTOR, metadata.create_all, db_engine)
+    await vision_coalescer.start()
+    await persister.start()
+    try:
+        yield
+    finally:
+        await vision_coalescer.stop()
+        await persister.stop()  # flushes whatever is still buffered
+        db_engine.dispose()
 
 app = FastAPI(title="Anomaly Detection API", lifespan=lifespan)
 
@@ -74,29 +168,110 @@ def map_severity(threats):
 def generate_event_id():
     return f"anomaly_{uuid.uuid4().hex[:8]}"
 
-async def detect_from_google_vision(image_bytes: bytes):
-    image = vision.Image(content=image_bytes)
+@contextmanager
+def vision_admission(count: int):
+    """Reserve `count` image slots for the whole request, or reject it before any work starts.
 
-    response = await asyncio.get_event_loop().run_in_executor(
-        EXECUTOR, lambda: vision_client.label_detection(image=image)
-    )
+    The check and the reservation happen with no await in between, so concurrent
+    requests cannot all pass the check and overshoot the limit together.
+    """
+    global pending_vision_calls
+    if count > MAX_PENDING_VISION_CALLS:
+        # Could never be admitted; a 503 + Retry-After would have the client retry forever
+        raise HTTPException(status_code=413, detail=f"At most {MAX_PENDING_VISION_CALLS} images per request")
+    if pending_vision_calls + count > MAX_PENDING_VISION_CALLS:
+        logger.warning(f"Shedding {count} image(s): {pending_vision_calls} Vision calls pending")
+        raise HTTPException(
+            status_code=503,
+            detail="Vision backlog is full, retry later",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+    pending_vision_calls += count
+    try:
+        yield
+    finally:
+        pending_vision_calls -= count
 
-    if response.error.message:
-        logger.error(f"Google Vision API error: {response.error.message}")
+async def detect_from_vision_backend(image_bytes: bytes):
+    try:
+        return await vision_coalescer.submit(image_bytes)
+    except VisionError as e:
+        logger.error(f"Google Vision API error: {e}")
         raise HTTPException(status_code=500, detail="Google Vision API error")
 
-    threats = []
-    for label in response.label_annotations:
-        name = label.description.lower()
-        if name in ["fire", "smoke", "gun", "knife"]:
-            threats.append({"label": name, "confidence": label.score})
+async def classify_locally(image_bytes: bytes):
+    start = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(LOCAL_EXECUTOR, local_classifier.classify, image_bytes)
+    finally:
+        TIER_LATENCY["local"].observe((time.perf_counter() - start) * 1000)
+
+async def detect_in_cloud(image_bytes: bytes):
+    start = time.perf_counter()
+    try:
+        return await detect_from_vision_backend(image_bytes)
+    finally:
+        TIER_LATENCY["cloud"].observe((time.perf_counter() - start) * 1000)
+
+async def detect_tiered(camera_id: str, image_bytes: bytes):
+    if local_classifier is None:
+        return await detect_in_cloud(image_bytes)
+
+    local_threats = await classify_locally(image_bytes)
+    if local_threats is not None:
+        top = max((t["confidence"] for t in local_threats), default=0.0)
+        if top < ESCALATE_LOW:
+            TIER_DECISIONS["local_benign"] += 1
+            return []
+        if top >= ESCALATE_HIGH:
+            TIER_DECISIONS["local_threat"] += 1
+            return [t for t in local_threats if t["confidence"] >= ESCALATE_LOW]
 
+    TIER_DECISIONS["escalated"] += 1
+    logger.info(f"[{camera_id}] Local classifier uncertain, escalating to {vision_backend.name}")
+    return await detect_in_cloud(image_bytes)
+
+async def detect_threats(camera_id: str, image_bytes: bytes):
+    image_hash = await asyncio.get_running_loop().run_in_executor(EXECUTOR, dhash, image_bytes)
+    if image_hash is not None:
+        cached = vision_cache.get(camera_id, image_hash)
+        if cached is not None:
+            logger.info(f"[{camera_id}] Near-duplicate frame, reusing cached Vision result")
+            return cached
+
+    threats = await detect_tiered(camera_id, image_bytes)
+    if image_hash is not None:
+        vision_cache.put(camera_id, image_hash, threats)
     return threats
 
-async def store_anomaly_to_db(event: dict):
-    await asyncio.get_running_loop().run_in_executor(
-        EXECUTOR, lambda: logger.info(f"Storing event to DB: {event['event_id']}")
-    )
+def build_anomaly_event(threats_with_conf, threat_labels, camera_id: str, location: str, zone_id: str):
+    return {
+        "event_id": generate_event_id(),
+        "status": "threat_detected",
+        "threats": threats_with_conf,
+        "message": f"Verified Threat(s): {', '.join(threat_labels)}",
+        "severity": map_severity(threats_with_conf),
+        "dispatch_type": map_dispatch_type(threats_with_conf),
+        "safe": False,
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "camera_id": camera_id,
+        "location": location,
+        "zone_id": zone_id,
+        "source": "anomaly-agent-v1.2",
+        "model_version": "vertex-smoke-v3.1"
+    }
+
+async def store_anomaly_to_db(event: dict, motion_score: Optional[float] = None, has_image: bool = False):
+    event_row, image_rows = event_rows(event, motion_score, has_image)
+    try:
+        persister.submit((event_row, image_rows))
+    except BufferFull as e:
+        logger.warning(f"Shedding event {event['event_id']}: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Event store is backed up, retry later",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
 
 # ---------------- Main Endpoint ----------------
 @app.post("/detect-anomaly/")
@@ -105,12 +280,14 @@ async def process_anomaly(
     location: str = Form(...),
     zone_id: str = Form(...),
     threats: Optional[str] = Form(None),  # comma-separated string or JSON string
+    motion_score: Optional[float] = Form(None),
     image: UploadFile = File(None)
 ):
     if image is not None:
         logger.info("Image received. Sending to Google Vision for analysis.")
-        image_bytes = await image.read()
-        threats_with_conf = await detect_from_google_vision(image_bytes)
+        with vision_admission(1):
+            image_bytes = await image.read()
+            threats_with_conf = await detect_threats(camera_id, image_bytes)
         threat_labels = [t["label"] for t in threats_with_conf]
     elif threats:
         try:
@@ -128,22 +305,57 @@ async def process_anomaly(
     if not threats_with_conf:
         raise HTTPException(status_code=400, detail="No threats provided or detected.")
 
-    anomaly_event = {
-        "event_id": generate_event_id(),
-        "status": "threat_detected",
-        "threats": threats_with_conf,
-        "message": f"Verified Threat(s): {', '.join(threat_labels)}",
-        "severity": map_severity(threats_with_conf),
-        "dispatch_type": map_dispatch_type(threats_with_conf),
-        "safe": False,
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-        "camera_id": camera_id,
-        "location": location,
-        "zone_id": zone_id,
-        "source": "anomaly-agent-v1.2",
-        "model_version": "vertex-smoke-v3.1"
-    }
-
-    await store_anomaly_to_db(anomaly_event)
+    anomaly_event = build_anomaly_event(threats_with_conf, threat_labels, camera_id, location, zone_id)
+    await store_anomaly_to_db(anomaly_event, motion_score, has_image=image is not None)
 
     return {"status": "success", "event": anomaly_event}
+
+@app.post("/detect-anomaly/batch")
+async def process_anomaly_batch(
+    camera_id: str = Form(...),
+    location: str = Form(...),
+    zone_id: str = Form(...),
+    images: List[UploadFile] = File(...)
+):
+    # Admit the whole request or none of it, so a client never gets half its images analysed
+    with vision_admission(len(images)):
+        logger.info(f"Batch of {len(images)} images received for {camera_id}.")
+        payloads = [await image.read() for image in images]
+        # Errors stay per image, as the coalescer reports them; batch-mates still get their results
+        detections = await asyncio.gather(*(detect_threats(camera_id, b) for b in payloads), return_exceptions=True)
+
+    results = []
+    for image, threats_with_conf in zip(images, detections):
+        if isinstance(threats_with_conf, HTTPException):
+            results.append({"filename": image.filename, "status": "error", "detail": threats_with_conf.detail})
+            continue
+        if isinstance(threats_with_conf, Exception):
+            logger.error(f"[{camera_id}] Analysis of {image.filename} failed: {threats_with_conf!r}")
+            results.append({"filename": image.filename, "status": "error", "detail": "Analysis failed"})
+            continue
+        if not threats_with_conf:
+            results.append({"filename": image.filename, "status": "no_threat", "safe": True})
+            continue
+        threat_labels = [t["label"] for t in threats_with_conf]
+        anomaly_event = build_anomaly_event(threats_with_conf, threat_labels, camera_id, location, zone_id)
+        await store_anomaly_to_db(anomaly_event, has_image=True)
+        results.append({"filename": image.filename, "status": "threat_detected", "event": anomaly_event})
+
+    return {"status": "success", "results": results}
+
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "vision_backend": vision_backend.name,
+        "pending_vision_calls": pending_vision_calls,
+        "vision_cache": vision_cache.stats(),
+        "vision_batching": vision_coalescer.stats(),
+        "persistence": persister.stats(),
+        "tiers": {
+            "local_classifier": LOCAL_CLASSIFIER,
+            "escalation_band": [ESCALATE_LOW, ESCALATE_HIGH],
+            "decisions": TIER_DECISIONS,
+            "latency_ms": {tier: hist.snapshot() for tier, hist in TIER_LATENCY.items()}
+        }
+    }
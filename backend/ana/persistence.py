@@ -0,0 +1,75 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import JSON, TIMESTAMP, Boolean, Column, Float, MetaData, Table, Text, Uuid
+from sqlalchemy.dialects.postgresql import JSONB
+
+# ----------- Tables -----------
+# Core mirrors of SQL_db/models.py's `events` and `images`; that module owns the PostgreSQL schema
+metadata = MetaData()
+
+events_table = Table(
+    "events", metadata,
+    Column("event_id", Uuid, primary_key=True),
+    Column("event_type", Text),
+    Column("zone", Text),
+    Column("location", Text),
+    Column("severity", Text),
+    Column("threat_level", Text),
+    Column("timestamp", TIMESTAMP),
+    Column("details_json", JSON().with_variant(JSONB(), "postgresql")),
+    Column("summary_id", Uuid, nullable=True),
+)
+
+images_table = Table(
+    "images", metadata,
+    Column("image_id", Uuid, primary_key=True),
+    Column("event_id", Uuid),
+    Column("blob_url", Text),
+    Column("timestamp", TIMESTAMP),
+    Column("camera_id", Text),
+    Column("motion_score", Float),
+    Column("is_anomaly_frame", Boolean),
+)
+
+THREAT_LEVELS = {"high": "critical", "medium": "elevated", "low": "low"}
+
+# ----------- Row Mapping -----------
+def event_rows(anomaly_event: dict, motion_score=None, has_image: bool = False):
+    """(events row, [images rows]) for one anomaly event; the agent's string id is kept in details_json."""
+    event_id = uuid.uuid4()
+    timestamp = datetime.fromisoformat(anomaly_event["timestamp"].rstrip("Z"))
+    event_row = {
+        "event_id": event_id,
+        "event_type": anomaly_event["dispatch_type"],
+        "zone": anomaly_event["zone_id"],
+        "location": anomaly_event["location"],
+        "severity": anomaly_event["severity"],
+        "threat_level": THREAT_LEVELS.get(anomaly_event["severity"], anomaly_event["severity"]),
+        "timestamp": timestamp,
+        "details_json": anomaly_event,
+        "summary_id": None,
+    }
+    image_rows = []
+    if has_image:
+        image_rows.append({
+            "image_id": uuid.uuid4(),
+            "event_id": event_id,
+            "blob_url": None,
+            "timestamp": timestamp,
+            "camera_id": anomaly_event["camera_id"],
+            "motion_score": motion_score,
+            "is_anomaly_frame": True,
+        })
+    return event_row, image_rows
+
+# ----------- Write -----------
+def write_batch(engine, batch):
+    """(events row, [images rows]) pairs in one transaction, one executemany per table (multi-row INSERTs)."""
+    events = [event for event, _ in batch]
+    images = [image for _, rows in batch for image in rows]
+    with engine.begin() as conn:
+        if events:
+            conn.execute(events_table.insert(), events)
+        if images:
+            conn.execute(images_table.insert(), images)
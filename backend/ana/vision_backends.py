@@ -0,0 +1,83 @@
+import json
+import os
+
+# ----------- Config -----------
+THREAT_LABELS = ("fire", "smoke", "gun", "knife")
+MAX_IMAGES_PER_BATCH = 16  # Cloud Vision limit for a synchronous batch_annotate_images call
+
+# ----------- Errors -----------
+class VisionError(Exception):
+    """The vision service answered with an error for this image."""
+
+def extract_threats(label_annotations):
+    threats = []
+    for label in label_annotations:
+        name = label.description.lower()
+        if name in THREAT_LABELS:
+            threats.append({"label": name, "confidence": label.score})
+    return threats
+
+# ----------- Backends -----------
+class GoogleVisionBackend:
+    """Label detection through the Google Cloud Vision API."""
+
+    name = "google"
+
+    def __init__(self, credentials_file: str):
+        from google.cloud import vision
+        from google.oauth2 import service_account
+
+        self._vision = vision
+        credentials = service_account.Credentials.from_service_account_file(credentials_file)
+        self.client = vision.ImageAnnotatorClient(credentials=credentials)
+
+    def detect(self, image_bytes: bytes):
+        response = self.client.label_detection(image=self._vision.Image(content=image_bytes))
+        if response.error.message:
+            raise VisionError(response.error.message)
+        return extract_threats(response.label_annotations)
+
+    def detect_batch(self, images):
+        """One batch_annotate_images call; per-image failures come back as VisionError entries."""
+        vision = self._vision
+        feature = vision.Feature(type_=vision.Feature.Type.LABEL_DETECTION)
+        requests = [vision.AnnotateImageRequest(image=vision.Image(content=b), features=[feature]) for b in images]
+        response = self.client.batch_annotate_images(requests=requests)
+        results = []
+        for item in response.responses:
+            if item.error.message:
+                results.append(VisionError(item.error.message))
+            else:
+                results.append(extract_threats(item.label_annotations))
+        return results
+
+class FakeVisionBackend:
+    """Local stand-in for tests and load runs: returns a fixed threat list without any network call.
+
+    Labels come from FAKE_VISION_THREATS, a JSON list like [{"label": "fire", "confidence": 0.92}].
+    """
+
+    name = "fake"
+
+    def __init__(self, threats=None):
+        if threats is None:
+            threats = json.loads(os.getenv("FAKE_VISION_THREATS", '[{"label": "smoke", "confidence": 0.75}]'))
+        self.threats = threats
+        self.calls = 0
+        self.batch_calls = 0
+
+    def detect(self, image_bytes: bytes):
+        self.calls += 1
+        return [dict(t) for t in self.threats]
+
+    def detect_batch(self, images):
+        self.batch_calls += 1
+        return [self.detect(b) for b in images]
+
+# ----------- Factory -----------
+def create_vision_backend(kind: str, credentials_file: str):
+    if kind == "google":
+        return GoogleVisionBackend(credentials_file)
+    if kind == "fake":
+        return FakeVisionBackend()
+    raise ValueError(f"Unknown vision backend '{kind}', expected 'google' or 'fake'")
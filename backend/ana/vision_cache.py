@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import cv2
+import numpy as np
+
+# ----------- Perceptual Hash -----------
+def dhash(image_bytes: bytes, hash_size: int = 8) -> Optional[int]:
+    """64-bit difference hash of the image; None if it cannot be decoded.
+
+    Decoding at 1/8 scale (done inside libjpeg for JPEGs) is plenty for a 9x8 thumbnail.
+    """
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if img is None:
+        return None
+    small = cv2.resize(img, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+# ----------- Cache -----------
+class PerceptualCache:
+    """Per-camera cache of detection results keyed by perceptual hash.
+
+    A lookup hits when a live entry for the same camera is within `max_distance` bits
+    (Hamming) of the new frame's hash. Entries expire after `ttl` seconds; each camera
+    keeps at most `max_per_camera` entries and at most `max_cameras` cameras are
+    tracked, both evicted least-recently-used first.
+    """
+
+    def __init__(self, max_distance: int = 6, ttl: float = 30.0, max_per_camera: int = 32, max_cameras: int = 1024):
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_per_camera = max_per_camera
+        self.max_cameras = max_cameras
+        self._cameras = OrderedDict()  # camera_id -> OrderedDict[hash -> (result, expires_at)]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, camera_id: str, image_hash: int):
+        entries = self._cameras.get(camera_id)
+        if entries is None:
+            self.misses += 1
+            return None
+        self._cameras.move_to_end(camera_id)
+
+        now = time.monotonic()
+        best_hash, best_distance = None, self.max_distance + 1
+        for cached_hash, (_, expires_at) in list(entries.items()):
+            if expires_at <= now:
+                del entries[cached_hash]
+                continue
+            distance = (cached_hash ^ image_hash).bit_count()
+            if distance < best_distance:
+                best_hash, best_distance = cached_hash, distance
+
+        if best_hash is None:
+            self.misses += 1
+            return None
+        entries.move_to_end(best_hash)
+        self.hits += 1
+        return entries[best_hash][0]
+
+    def put(self, camera_id: str, image_hash: int, result):
+        entries = self._cameras.get(camera_id)
+        if entries is None:
+            entries = self._cameras[camera_id] = OrderedDict()
+            if len(self._cameras) > self.max_cameras:
+                _, dropped = self._cameras.popitem(last=False)
+                self.evictions += len(dropped)
+        self._cameras.move_to_end(camera_id)
+
+        entries[image_hash] = (result, time.monotonic() + self.ttl)
+        entries.move_to_end(image_hash)
+        if len(entries) > self.max_per_camera:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "cameras": len(self._cameras),
+            "entries": sum(len(entries) for entries in self._cameras.values()),
+        }
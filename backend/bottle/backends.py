@@ -0,0 +1,188 @@
+import ast
+import json
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+import torchvision
+
+# ----------- Config -----------
+MAX_DETECTIONS = 300
+LETTERBOX_COLOR = (114, 114, 114)
+DEFAULT_MODEL_FILES = {
+    "torchhub": "yolov5s.pt",
+    "torchscript": "yolov5s.torchscript",  # yolov5 export.py --include torchscript
+    "onnx": "yolov5s.onnx",  # yolov5 export.py --include onnx [--dynamic]
+}
+
+# ----------- Pre/Post-Processing for Exported Models -----------
+def letterbox(img: np.ndarray, size: int):
+    """Resize keeping aspect ratio and pad to size x size; returns (image, scale, (pad_x, pad_y))."""
+    height, width = img.shape[:2]
+    scale = min(size / height, size / width)
+    new_w, new_h = round(width * scale), round(height * scale)
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+    if (new_w, new_h) != (width, height):
+        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = round(pad_y - 0.1), round(pad_y + 0.1)
+    left, right = round(pad_x - 0.1), round(pad_x + 0.1)
+    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    return img, scale, (left, top)
+
+def to_input_batch(images, size: int):
+    """BGR images -> float32 NCHW RGB batch in [0, 1], plus the letterbox geometry of each image."""
+    batch = np.empty((len(images), 3, size, size), dtype=np.float32)
+    geometry = []
+    for i, img in enumerate(images):
+        boxed, scale, pad = letterbox(img, size)
+        batch[i] = boxed[:, :, ::-1].transpose(2, 0, 1)
+        geometry.append((scale, pad, img.shape[:2]))
+    batch /= 255.0
+    return batch, geometry
+
+def non_max_suppression(raw: torch.Tensor, conf: float, iou: float):
+    """YOLOv5 head output (N, anchors, 5 + classes) -> list of (n, 6) [x1, y1, x2, y2, conf, cls]."""
+    outputs = []
+    for x in raw:
+        x = x[x[:, 4] > conf]
+        if not len(x):
+            outputs.append(torch.zeros((0, 6)))
+            continue
+        scores, cls = (x[:, 5:] * x[:, 4:5]).max(1)
+        keep = scores > conf
+        x, scores, cls = x[keep], scores[keep], cls[keep]
+
+        boxes = torch.empty((len(x), 4))
+        boxes[:, 0] = x[:, 0] - x[:, 2] / 2
+        boxes[:, 1] = x[:, 1] - x[:, 3] / 2
+        boxes[:, 2] = x[:, 0] + x[:, 2] / 2
+        boxes[:, 3] = x[:, 1] + x[:, 3] / 2
+
+        kept = torchvision.ops.batched_nms(boxes, scores, cls, iou)[:MAX_DETECTIONS]
+        outputs.append(torch.cat([boxes[kept], scores[kept, None], cls[kept, None].float()], dim=1))
+    return outputs
+
+def scale_boxes(pred: torch.Tensor, geometry):
+    """Map boxes from letterboxed model input back to original image coordinates, in place."""
+    scale, (pad_x, pad_y), (height, width) = geometry
+    pred[:, [0, 2]] = ((pred[:, [0, 2]] - pad_x) / scale).clamp(0, width)
+    pred[:, [1, 3]] = ((pred[:, [1, 3]] - pad_y) / scale).clamp(0, height)
+    return pred
+
+def _parse_names(raw):
+    """Index -> class name list from a list, or a dict keyed by index (string keys in TorchScript's JSON config)."""
+    names = ast.literal_eval(raw) if isinstance(raw, str) else raw
+    if isinstance(names, dict):
+        return [names[i] for i in sorted(names, key=int)]
+    return list(names)
+
+# ----------- Backends -----------
+class InferenceBackend:
+    """Runs the detector on a list of BGR images and returns one (n, 6) xyxy tensor per image."""
+
+    name = "base"
+    names: list = []
+
+    def predict(self, images) -> list:
+        raise NotImplementedError
+
+    def warmup(self, input_size: int, runs: int = 2):
+        # First passes pay for lazy allocation, kernel selection and graph optimisation
+        dummy = np.full((input_size, input_size, 3), 114, dtype=np.uint8)
+        for _ in range(runs):
+            self.predict([dummy])
+
+class TorchHubBackend(InferenceBackend):
+    name = "torchhub"
+
+    def __init__(self, model_path: Path, yolov5_dir: Path, conf: float, iou: float):
+        sys.path.insert(0, str(yolov5_dir.resolve()))
+        self.model = torch.hub.load('.', 'custom', path=str(model_path), source='local')
+        self.model.eval()
+        self.model.conf = conf
+        self.model.iou = iou
+        self.names = _parse_names(self.model.names)
+
+    def predict(self, images):
+        with torch.inference_mode():
+            results = self.model(images)
+        return [pred.cpu() for pred in results.xyxy]
+
+class TorchScriptBackend(InferenceBackend):
+    """A `yolov5 export.py --include torchscript` model."""
+
+    name = "torchscript"
+
+    def __init__(self, model_path: Path, input_size: int, conf: float, iou: float):
+        extra_files = {"config.txt": ""}
+        self.model = torch.jit.load(str(model_path), map_location="cpu", _extra_files=extra_files)
+        self.model.eval()
+        self.input_size = input_size
+        self.conf = conf
+        self.iou = iou
+        config = json.loads(extra_files["config.txt"] or "{}")
+        if "names" not in config:
+            raise ValueError(f"{model_path} has no class names in its config.txt; re-export it with yolov5 export.py")
+        self.names = _parse_names(config["names"])
+
+    def predict(self, images):
+        batch, geometry = to_input_batch(images, self.input_size)
+        with torch.inference_mode():
+            raw = self.model(torch.from_numpy(batch))
+        if isinstance(raw, (list, tuple)):
+            raw = raw[0]
+        preds = non_max_suppression(raw, self.conf, self.iou)
+        return [scale_boxes(pred, geo) for pred, geo in zip(preds, geometry)]
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """A `yolov5 export.py --include onnx` model run with ONNX Runtime on CPU."""
+
+    name = "onnx"
+
+    def __init__(self, model_path: Path, input_size: int, conf: float, iou: float, intra_op_threads: int = 0):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("INFERENCE_BACKEND=onnx requires the onnxruntime package") from e
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Exports without --dynamic have a fixed batch dimension of 1
+        self.fixed_batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+        self.input_size = input_size
+        self.conf = conf
+        self.iou = iou
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if "names" not in metadata:
+            raise ValueError(f"{model_path} has no 'names' metadata; re-export it with yolov5 export.py")
+        self.names = _parse_names(metadata["names"])
+
+    def predict(self, images):
+        batch, geometry = to_input_batch(images, self.input_size)
+        if self.fixed_batch == 1:
+            raw = np.concatenate([self.session.run(None, {self.input_name: batch[i:i + 1]})[0] for i in range(len(batch))])
+        else:
+            raw = self.session.run(None, {self.input_name: batch})[0]
+        preds = non_max_suppression(torch.from_numpy(raw), self.conf, self.iou)
+        return [scale_boxes(pred, geo) for pred, geo in zip(preds, geometry)]
+
+# ----------- Factory -----------
+def create_backend(kind: str, model_path: Path, *, yolov5_dir: Path, input_size: int, conf: float, iou: float,
+                   intra_op_threads: int = 0) -> InferenceBackend:
+    if intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+
+    if kind == "torchhub":
+        return TorchHubBackend(model_path, yolov5_dir, conf, iou)
+    if kind == "torchscript":
+        return TorchScriptBackend(model_path, input_size, conf, iou)
+    if kind == "onnx":
+        return OnnxRuntimeBackend(model_path, input_size, conf, iou, intra_op_threads)
+    raise ValueError(f"Unknown inference backend '{kind}', expected one of {', '.join(DEFAULT_MODEL_FILES)}")
@@ -0,0 +1,145 @@
+import asyncio
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # backend/, home of the shared `common` package
+from common.batching import collect_batch
+
+# ----------- Errors -----------
+class Overloaded(Exception):
+    """Raised when the admission queue cannot take the submitted items right now."""
+
+class BatchTooLarge(Exception):
+    """Raised when more items are submitted at once than the admission queue can ever hold."""
+
+# ----------- Batch Metrics -----------
+class BatchMetrics:
+    """Rolling per-batch size and latency statistics."""
+
+    def __init__(self, window: int = 512):
+        self.batches = 0
+        self.images = 0
+        self.rejected = 0
+        self._sizes = deque(maxlen=window)
+        self._latencies_ms = deque(maxlen=window)
+
+    def record(self, size: int, latency_ms: float):
+        self.batches += 1
+        self.images += size
+        self._sizes.append(size)
+        self._latencies_ms.append(latency_ms)
+
+    @staticmethod
+    def _percentile(values, pct: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+    def snapshot(self) -> dict:
+        sizes = list(self._sizes)
+        latencies = list(self._latencies_ms)
+        return {
+            "batches": self.batches,
+            "images": self.images,
+            "rejected": self.rejected,
+            "avg_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+            "max_batch_size_seen": max(sizes, default=0),
+            "batch_latency_ms": {
+                "avg": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+                "p50": round(self._percentile(latencies, 50), 2),
+                "p95": round(self._percentile(latencies, 95), 2),
+                "p99": round(self._percentile(latencies, 99), 2),
+            },
+        }
+
+# ----------- Micro-Batcher -----------
+class MicroBatcher:
+    """Coalesces concurrent single-item submissions into one batched call.
+
+    A batch is dispatched as soon as it holds `max_batch_size` items or `max_wait_ms`
+    has passed since its first item arrived. `infer_batch(items) -> results` runs on
+    `executor` so the forward pass never blocks the event loop; up to
+    `max_concurrent_batches` run at once. At most `max_queue` items wait for a
+    batch; beyond that, submissions fail fast with Overloaded, and a single
+    submission larger than `max_queue` fails with BatchTooLarge.
+    """
+
+    def __init__(self, infer_batch, *, max_batch_size: int, max_wait_ms: float, executor,
+                 max_concurrent_batches: int = 1, max_queue: int = 0):
+        self.infer_batch = infer_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self.max_concurrent_batches = max_concurrent_batches
+        self.max_queue = max_queue
+        self.metrics = BatchMetrics()
+        self._queue = None
+        self._slots = None
+        self._worker = None
+        self._in_flight = set()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, *self._in_flight, return_exceptions=True)
+            self._worker = None
+
+    async def submit(self, item):
+        return (await self.submit_many([item]))[0]
+
+    async def submit_many(self, items):
+        """Admit all of `items` or none of them, then wait for their results in order."""
+        if self.max_queue and len(items) > self.max_queue:
+            raise BatchTooLarge(f"{len(items)} items submitted, the queue holds at most {self.max_queue}")
+        if self.max_queue and self._queue.qsize() + len(items) > self.max_queue:
+            self.metrics.rejected += len(items)
+            raise Overloaded(f"inference queue full ({self._queue.qsize()}/{self.max_queue})")
+
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in items]
+        for item, future in zip(items, futures):
+            self._queue.put_nowait((item, future))
+        return await asyncio.gather(*futures)
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            batch = await collect_batch(self._queue, self.max_batch_size, self.max_wait)
+            # Requests whose client already went away are dropped before the forward pass
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                self._slots.release()
+                continue
+            task = asyncio.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            results = await loop.run_in_executor(self.executor, self.infer_batch, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+        self.metrics.record(len(batch), (time.perf_counter() - start) * 1000)
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
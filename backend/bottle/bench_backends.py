@@ -0,0 +1,64 @@
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backends import DEFAULT_MODEL_FILES, create_backend
+
+# ----------- Synthetic Images -----------
+def synthetic_images(count: int, size=(1280, 720)):
+    width, height = size
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+# ----------- Main -----------
+def main():
+    parser = argparse.ArgumentParser(description="Per-image latency and batched throughput of each inference backend.")
+    parser.add_argument("--backend", action="append", choices=list(DEFAULT_MODEL_FILES),
+                        help="backend to benchmark (repeatable; default: all)")
+    parser.add_argument("--model-dir", type=Path, default=Path("models"))
+    parser.add_argument("--yolov5-dir", type=Path, default=Path("./yolov5"))
+    parser.add_argument("--input-size", type=int, default=640)
+    parser.add_argument("--threads", type=int, default=0, help="intra-op threads (0 = runtime default)")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    images = synthetic_images(args.batch_size)
+    print(f"{'backend':>12} {'load+warmup (s)':>16} {'p50 ms/img':>11} {'p95 ms/img':>11} {'batch img/s':>12}")
+    for kind in args.backend or list(DEFAULT_MODEL_FILES):
+        model_path = args.model_dir / DEFAULT_MODEL_FILES[kind]
+        if not model_path.exists():
+            print(f"{kind:>12} skipped: {model_path} not found")
+            continue
+
+        start = time.perf_counter()
+        backend = create_backend(
+            kind, model_path, yolov5_dir=args.yolov5_dir, input_size=args.input_size,
+            conf=0.25, iou=0.45, intra_op_threads=args.threads,
+        )
+        backend.warmup(args.input_size)
+        load_s = time.perf_counter() - start
+
+        latencies = []
+        for i in range(args.iterations):
+            start = time.perf_counter()
+            backend.predict([images[i % len(images)]])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        for _ in range(max(1, args.iterations // args.batch_size)):
+            backend.predict(images)
+        elapsed = time.perf_counter() - start
+        throughput = max(1, args.iterations // args.batch_size) * len(images) / elapsed
+
+        print(f"{kind:>12} {load_s:>16.2f} {_percentile(latencies, 50):>11.1f} "
+              f"{_percentile(latencies, 95):>11.1f} {throughput:>12.1f}")
+
+if __name__ == "__main__":
+    main()
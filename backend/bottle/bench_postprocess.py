@@ -0,0 +1,60 @@
+import argparse
+import time
+from collections import Counter
+
+import pandas as pd
+import torch
+
+from postprocess import count_classes
+
+# ----------- Config -----------
+NUM_CLASSES = 80  # COCO, as in yolov5s
+DETECTION_COUNTS = [0, 10, 50, 200, 1000]
+
+# ----------- Baseline: DataFrame Path -----------
+def count_with_pandas(pred: torch.Tensor, name_table: list) -> dict:
+    # Mirrors yolov5's Detections.pandas().xyxy followed by the old Counter over 'name'
+    columns = ["xmin", "ymin", "xmax", "ymax", "confidence", "class", "name"]
+    rows = [x[:5] + [int(x[5]), name_table[int(x[5])]] for x in pred.tolist()]
+    predictions = pd.DataFrame(rows, columns=columns)
+    return dict(Counter(predictions["name"].tolist()))
+
+def _synthetic_predictions(count: int) -> torch.Tensor:
+    gen = torch.Generator().manual_seed(count)
+    boxes = torch.rand(count, 4, generator=gen) * 640
+    conf = torch.rand(count, 1, generator=gen)
+    # Skew towards class 0 ("person"), as in crowd footage
+    cls = torch.where(
+        torch.rand(count, generator=gen) < 0.7,
+        torch.zeros(count),
+        torch.randint(0, NUM_CLASSES, (count,), generator=gen).float(),
+    ).unsqueeze(1)
+    return torch.cat([boxes, conf, cls], dim=1)
+
+def _per_call_us(fn, pred, name_table, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(pred, name_table)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+# ----------- Main -----------
+def main():
+    parser = argparse.ArgumentParser(description="Class counting: pandas DataFrame vs torch.bincount.")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    name_table = [f"class_{i}" for i in range(NUM_CLASSES)]
+    name_table[0] = "person"
+
+    print(f"{'detections':>10} {'pandas (us)':>12} {'bincount (us)':>14} {'speedup':>8}")
+    for count in DETECTION_COUNTS:
+        pred = _synthetic_predictions(count)
+        if count_with_pandas(pred, name_table) != count_classes(pred, name_table):
+            print(f"[!] counts differ for {count} detections")
+
+        pandas_us = _per_call_us(count_with_pandas, pred, name_table, args.iterations)
+        bincount_us = _per_call_us(count_classes, pred, name_table, args.iterations)
+        print(f"{count:>10} {pandas_us:>12.1f} {bincount_us:>14.1f} {pandas_us / bincount_us:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,191 @@
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.responses import JSONResponse
-import torch, cv2, sys, os, json
+from contextlib import asynccontextmanager
+from typing import List, Optional
+import os
+import time
+import asyncio
+import atexit
+import concurrent.futures
+import sys
 from pathlib import Path
-from collections import Counter
 import logging
 
-app = FastAPI()
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # backend/, home of the shared `common` package
+from common.decode import decode_for_model
+from backends import DEFAULT_MODEL_FILES, create_backend
+from batcher import BatchTooLarge, MicroBatcher, Overloaded
+from postprocess import count_classes, filter_predictions, resolve_class_ids
+
 logger = logging.getLogger("bottleneck-agent")
 
-# Setup model once at startup
+# ----------- Batching Config -----------
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "8"))
+MAX_BATCH_WAIT_MS = float(os.getenv("MAX_BATCH_WAIT_MS", "10"))  # latency a request may spend waiting for batch-mates
+
+# ----------- Admission Config -----------
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))  # batched forward passes that may run at once
+MAX_PENDING_IMAGES = int(os.getenv("MAX_PENDING_IMAGES", "64"))  # images waiting for a batch before we shed load
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "1"))
+MODEL_INPUT_SIZE = int(os.getenv("MODEL_INPUT_SIZE", "640"))
+
+# ----------- Detection Thresholds -----------
+# Floors applied inside the forward pass; requests may only tighten them
+MODEL_CONF = float(os.getenv("MODEL_CONF", "0.25"))
+MODEL_IOU = float(os.getenv("MODEL_IOU", "0.45"))
+
+# ----------- Inference Backend Config -----------
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torchhub")  # torchhub | torchscript | onnx
+INTRA_OP_THREADS = int(os.getenv("INTRA_OP_THREADS", "0"))  # 0 keeps the runtime default
+WARMUP_RUNS = int(os.getenv("WARMUP_RUNS", "2"))
+
 YOLOV5_DIR = Path('./yolov5')
-MODEL_PATH = Path('models/yolov5s.pt')
-sys.path.insert(0, str(YOLOV5_DIR.resolve()))
-model = torch.hub.load('.', 'custom', path=str(MODEL_PATH), source='local')
-model.eval()
+MODEL_PATH = Path(os.getenv("MODEL_PATH", str(Path('models') / DEFAULT_MODEL_FILES.get(INFERENCE_BACKEND, 'yolov5s.pt'))))
+
+# Loaded and warmed up in lifespan, before the first request is accepted
+backend = None
+CLASS_NAMES = []
+
+# ----------- Executors -----------
+# Inference gets its own small pool so forward passes never queue behind image decodes
+INFERENCE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=INFERENCE_WORKERS)
+atexit.register(INFERENCE_EXECUTOR.shutdown, wait=False)
+DECODE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count() or 4)
+atexit.register(DECODE_EXECUTOR.shutdown, wait=False)
+
+def load_backend():
+    loaded = create_backend(
+        INFERENCE_BACKEND,
+        MODEL_PATH,
+        yolov5_dir=YOLOV5_DIR,
+        input_size=MODEL_INPUT_SIZE,
+        conf=MODEL_CONF,
+        iou=MODEL_IOU,
+        intra_op_threads=INTRA_OP_THREADS,
+    )
+    loaded.warmup(MODEL_INPUT_SIZE, WARMUP_RUNS)
+    return loaded
+
+def run_model_batch(images):
+    return backend.predict(images)
+
+batcher = MicroBatcher(
+    run_model_batch,
+    max_batch_size=MAX_BATCH_SIZE,
+    max_wait_ms=MAX_BATCH_WAIT_MS,
+    executor=INFERENCE_EXECUTOR,
+    max_concurrent_batches=INFERENCE_WORKERS,
+    max_queue=MAX_PENDING_IMAGES,
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global backend, CLASS_NAMES
+    start = time.perf_counter()
+    backend = await asyncio.get_running_loop().run_in_executor(INFERENCE_EXECUTOR, load_backend)
+    CLASS_NAMES = backend.names
+    logger.info(f"Loaded {backend.name} backend from {MODEL_PATH} and warmed up in {time.perf_counter() - start:.1f}s")
+    await batcher.start()
+    try:
+        yield
+    finally:
+        await batcher.stop()
+
+app = FastAPI(lifespan=lifespan)
+
+async def decode_image(img_bytes):
+    loop = asyncio.get_running_loop()
+    img = await loop.run_in_executor(DECODE_EXECUTOR, decode_for_model, img_bytes, MODEL_INPUT_SIZE)
+    if img is None:
+        raise HTTPException(status_code=400, detail="Could not decode image")
+    return img
+
+async def infer(imgs):
+    try:
+        return await batcher.submit_many(imgs)
+    except BatchTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Overloaded as e:
+        logger.warning(f"Shedding load: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Inference queue is full, retry later",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+
+def parse_filters(conf, iou, classes):
+    if conf is not None and not 0 <= conf <= 1:
+        raise HTTPException(status_code=400, detail="conf must be between 0 and 1")
+    if iou is not None and not 0 <= iou <= 1:
+        raise HTTPException(status_code=400, detail="iou must be between 0 and 1")
+    if iou is not None and iou >= MODEL_IOU:
+        iou = None  # the forward pass already applied a stricter NMS
+    class_ids = None
+    if classes:
+        try:
+            class_ids = resolve_class_ids([c.strip() for c in classes.split(",") if c.strip()], CLASS_NAMES)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return conf, iou, class_ids
+
+def count_labels(pred, filters):
+    conf, iou, class_ids = filters
+    return count_classes(filter_predictions(pred, conf, iou, class_ids), CLASS_NAMES)
+
+def build_response(camera_id, zone_id, location, label_counts):
+    return {
+        "camera_id": camera_id,
+        "zone_id": zone_id,
+        "location": location,
+        "crowd_density": label_counts.get('person', 0),
+        "object_breakdown": label_counts,
+        "model_used": str(MODEL_PATH.name)
+    }
 
 @app.post("/analyze-density/")
 async def analyze_density(
     camera_id: str = Form(...),
     zone_id: str = Form(...),
     location: str = Form(...),
-    image: UploadFile = File(...)
+    image: UploadFile = File(...),
+    conf: Optional[float] = Form(None),
+    iou: Optional[float] = Form(None),
+    classes: Optional[str] = Form(None)  # comma-separated class names, e.g. "person,bicycle"
 ):
-    img_bytes = await image.read()
-    nparr = np.frombuffer(img_bytes, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    filters = parse_filters(conf, iou, classes)
+    img = await decode_image(await image.read())
+    (pred,) = await infer([img])
+    label_counts = count_labels(pred, filters)
+    return JSONResponse(content=build_response(camera_id, zone_id, location, label_counts))
 
-    results = model(img)
-    predictions = results.pandas().xyxy[0]
-    labels = predictions['name'].tolist()
-    label_counts = dict(Counter(labels))
-    crowd_count = label_counts.get('person', 0)
+@app.post("/analyze-density/batch")
+async def analyze_density_batch(
+    camera_id: str = Form(...),
+    zone_id: str = Form(...),
+    location: str = Form(...),
+    images: List[UploadFile] = File(...),
+    conf: Optional[float] = Form(None),
+    iou: Optional[float] = Form(None),
+    classes: Optional[str] = Form(None)
+):
+    if len(images) > MAX_PENDING_IMAGES:
+        # Would never fit the admission queue, so a 503 + Retry-After could not succeed on retry
+        raise HTTPException(status_code=413, detail=f"At most {MAX_PENDING_IMAGES} images per request")
+    filters = parse_filters(conf, iou, classes)
+    imgs = await asyncio.gather(*[decode_image(await image.read()) for image in images])
+    # Queued as individual items so they can share forward passes with concurrent single-image requests
+    preds = await infer(imgs)
+    return JSONResponse(content={
+        "results": [build_response(camera_id, zone_id, location, count_labels(pred, filters)) for pred in preds]
+    })
 
-    response = {
-        "camera_id": camera_id,
-        "zone_id": zone_id,
-        "location": location,
-        "crowd_density": crowd_count,
-        "object_breakdown": label_counts,
-        "model_used": str(MODEL_PATH.name)
+@app.get("/metrics")
+def metrics():
+    return {
+        "backend": backend.name if backend else None,
+        "batching": batcher.metrics.snapshot(),
+        "queue_depth": batcher.queue_depth,
+        "max_pending_images": MAX_PENDING_IMAGES,
+        "max_batch_size": MAX_BATCH_SIZE,
+        "max_batch_wait_ms": MAX_BATCH_WAIT_MS
     }
-    return JSONResponse(content=response)
@@ -0,0 +1,35 @@
+import torch
+import torchvision
+
+# ----------- Class Names -----------
+def resolve_class_ids(class_names, name_table: list) -> list:
+    """Map requested class names to indices; raises ValueError on names the model does not know."""
+    index = {name: i for i, name in enumerate(name_table)}
+    unknown = [name for name in class_names if name not in index]
+    if unknown:
+        raise ValueError(f"Unknown classes: {', '.join(unknown)}")
+    return [index[name] for name in class_names]
+
+# ----------- Detection Filtering -----------
+def filter_predictions(pred: torch.Tensor, conf=None, iou=None, class_ids=None) -> torch.Tensor:
+    """Apply per-request thresholds to an (n, 6) [x1, y1, x2, y2, conf, cls] prediction tensor.
+
+    The model's own conf/iou act as floors: a request can only be stricter, since
+    anything below them was already removed during the forward pass.
+    """
+    if conf is not None:
+        pred = pred[pred[:, 4] >= conf]
+    if class_ids:
+        pred = pred[torch.isin(pred[:, 5].long(), torch.as_tensor(class_ids, device=pred.device))]
+    if iou is not None and len(pred):
+        keep = torchvision.ops.batched_nms(pred[:, :4], pred[:, 4], pred[:, 5].long(), iou)
+        pred = pred[keep]
+    return pred
+
+# ----------- Class Counting -----------
+def count_classes(pred: torch.Tensor, name_table: list) -> dict:
+    """Count detections per class name with a single bincount over the class column."""
+    if not len(pred):
+        return {}
+    counts = torch.bincount(pred[:, 5].long(), minlength=len(name_table)).tolist()
+    return {name_table[i]: count for i, count in enumerate(counts) if count}
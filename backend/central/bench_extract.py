@@ -0,0 +1,108 @@
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from frame_extractor import iter_key_frames
+
+# ----------- Config -----------
+RESOLUTIONS = [(640, 360), (1280, 720), (1920, 1080)]
+DURATIONS = [10, 30, 60]  # seconds
+FPS = 30
+KEY_INTERVAL = 250  # long GOP, like typical H.264 camera uploads
+
+# ----------- Baseline: Seek-Based Extractor -----------
+def extract_key_frames_seek(video_path: str, interval: int, motion_threshold: int):
+    frames = []
+    vidcap = cv2.VideoCapture(video_path)
+    fps = vidcap.get(cv2.CAP_PROP_FPS) or 30
+    frame_interval = int(fps * interval)
+    success, prev = vidcap.read()
+    frame_id = 0
+
+    while success:
+        vidcap.set(cv2.CAP_PROP_POS_FRAMES, frame_id)
+        success, frame = vidcap.read()
+        if not success:
+            break
+
+        small_frame = cv2.resize(frame, (320, 240))
+        gray = cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY)
+        prev_gray = cv2.cvtColor(cv2.resize(prev, (320, 240)), cv2.COLOR_BGR2GRAY)
+        diff = cv2.absdiff(prev_gray, gray)
+        motion = np.mean(diff)
+
+        if motion >= motion_threshold:
+            _, jpeg = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
+            frames.append((jpeg.tobytes(), frame_id, motion))
+
+        prev = frame
+        frame_id += frame_interval
+
+    vidcap.release()
+    return frames
+
+# ----------- Synthetic Video -----------
+def write_synthetic_video(path: str, size, seconds: int, fps: int = FPS, key_interval: int = KEY_INTERVAL):
+    width, height = size
+    params = []
+    if hasattr(cv2, "VIDEOWRITER_PROP_KEY_INTERVAL"):
+        params = [cv2.VIDEOWRITER_PROP_KEY_INTERVAL, key_interval]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height), params)
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for i in range(seconds * fps):
+        frame = background.copy()
+        # A moving block plus a scene change every few seconds keeps the motion gate busy
+        x = (i * 7) % max(1, width - 100)
+        cv2.rectangle(frame, (x, height // 3), (x + 100, height // 3 + 100), (0, 0, 255), -1)
+        if (i // (fps * 3)) % 2:
+            frame = 255 - frame
+        writer.write(frame)
+    writer.release()
+
+def _time(fn, *args, repeat: int):
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(fn(*args))
+        best = min(best, time.perf_counter() - start)
+    return best, count
+
+# ----------- Main -----------
+def main():
+    parser = argparse.ArgumentParser(description="Compare seek-based and sequential key frame extraction.")
+    parser.add_argument("--interval", type=int, default=1, help="sampling interval in seconds")
+    parser.add_argument("--threshold", type=int, default=0, help="motion threshold")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--video", action="append", default=[], help="benchmark an existing file instead of synthetic ones")
+    parser.add_argument("--key-interval", type=int, default=KEY_INTERVAL, help="GOP length of the synthetic videos")
+    args = parser.parse_args()
+
+    print(f"{'video':>24} {'frames':>7} {'seek (s)':>10} {'sequential (s)':>15} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        videos = list(args.video)
+        if not videos:
+            for width, height in RESOLUTIONS:
+                for seconds in DURATIONS:
+                    path = os.path.join(tmp_dir, f"{width}x{height}_{seconds}s.mp4")
+                    write_synthetic_video(path, (width, height), seconds, key_interval=args.key_interval)
+                    videos.append(path)
+
+        for path in videos:
+            seek_s, seek_n = _time(extract_key_frames_seek, path, args.interval, args.threshold, repeat=args.repeat)
+            seq_s, seq_n = _time(
+                lambda *a: list(iter_key_frames(*a)), path, args.interval, args.threshold, repeat=args.repeat
+            )
+            if seek_n != seq_n:
+                print(f"[!] frame count mismatch: seek={seek_n} sequential={seq_n}")
+
+            name = os.path.basename(path)[-24:]
+            print(f"{name:>24} {seq_n:>7} {seek_s:>10.3f} {seq_s:>15.3f} {seek_s / seq_s:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
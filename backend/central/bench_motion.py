@@ -0,0 +1,69 @@
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from motion import MOTION_MODES, MOTION_SIZE, MotionScorer
+
+# ----------- Config -----------
+RESOLUTIONS = [(640, 360), (1280, 720), (1920, 1080)]
+
+# ----------- Baseline: Per-Frame Allocation -----------
+def score_baseline(prev: np.ndarray, frame: np.ndarray) -> float:
+    gray = cv2.cvtColor(cv2.resize(frame, MOTION_SIZE), cv2.COLOR_BGR2GRAY)
+    prev_gray = cv2.cvtColor(cv2.resize(prev, MOTION_SIZE), cv2.COLOR_BGR2GRAY)
+    return float(np.mean(cv2.absdiff(prev_gray, gray)))
+
+def _synthetic_frames(size, count: int):
+    width, height = size
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        frame = base.copy()
+        x = (i * 37) % max(1, width - 120)
+        cv2.rectangle(frame, (x, height // 4), (x + 120, height // 4 + 120), (255, 255, 255), -1)
+        frames.append(frame)
+    return frames
+
+def _per_frame_us(fn, frames, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(frames)
+        best = min(best, time.perf_counter() - start)
+    return best / len(frames) * 1e6
+
+# ----------- Main -----------
+def main():
+    parser = argparse.ArgumentParser(description="Per-frame cost of motion scoring.")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)  # measure single-core cost, as in a busy executor thread
+
+    print(f"{'resolution':>12} {'scorer':>10} {'us/frame':>10}")
+    for size in RESOLUTIONS:
+        frames = _synthetic_frames(size, args.frames)
+        resolution = f"{size[0]}x{size[1]}"
+
+        def run_baseline(frames):
+            prev = frames[0]
+            for frame in frames:
+                score_baseline(prev, frame)
+                prev = frame
+
+        print(f"{resolution:>12} {'baseline':>10} {_per_frame_us(run_baseline, frames, args.repeat):>10.1f}")
+
+        for mode in MOTION_MODES:
+            def run_scorer(frames, mode=mode):
+                scorer = MotionScorer(mode)
+                for frame in frames:
+                    scorer.score(frame)
+
+            print(f"{resolution:>12} {mode:>10} {_per_frame_us(run_scorer, frames, args.repeat):>10.1f}")
+
+if __name__ == "__main__":
+    main()
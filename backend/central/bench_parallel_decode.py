@@ -0,0 +1,58 @@
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import tempfile
+import time
+
+from bench_extract import write_synthetic_video
+from frame_extractor import iter_key_frames
+from parallel_decode import iter_key_frames_parallel
+
+# ----------- Main -----------
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of sequential vs process-pool key frame extraction.")
+    parser.add_argument("--video", help="benchmark an existing file instead of a synthetic one")
+    parser.add_argument("--seconds", type=int, default=240, help="length of the synthetic video")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--threshold", type=float, default=0)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1)))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = args.video
+        if path is None:
+            path = os.path.join(tmp_dir, "synthetic.mp4")
+            write_synthetic_video(path, (args.width, args.height), args.seconds)
+
+        start = time.perf_counter()
+        frames = list(iter_key_frames(path, args.interval, args.threshold))
+        sequential_s = time.perf_counter() - start
+        expected = [frame.frame_id for frame in frames]
+        print(f"{'mode':>14} {'frames':>7} {'seconds':>9} {'frames/s':>9} {'speedup':>8}")
+        print(f"{'sequential':>14} {len(frames):>7} {sequential_s:>9.2f} {len(frames) / sequential_s:>9.1f} {1.0:>7.1f}x")
+
+        for workers in worker_counts:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                # Start the workers outside the timed region, as a long-lived server would have them
+                list(pool.map(abs, range(workers)))
+
+                start = time.perf_counter()
+                frames = list(iter_key_frames_parallel(
+                    path, args.interval, args.threshold, pool=pool, workers=workers
+                ))
+                elapsed = time.perf_counter() - start
+
+            if [frame.frame_id for frame in frames] != expected:
+                print(f"[!] {workers} workers returned different frames than the sequential decode")
+            label = f"{workers} processes"
+            print(f"{label:>14} {len(frames):>7} {elapsed:>9.2f} {len(frames) / elapsed:>9.1f} {sequential_s / elapsed:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import base64
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2
+
+from motion import MotionScorer
+
+# ----------- Config -----------
+JPEG_QUALITY = 80
+
+# ----------- Frame Record -----------
+@dataclass(slots=True)
+class FrameRecord:
+    """A sampled frame as it moves through the pipeline: a view of the encoded JPEG plus its metadata.
+
+    Base64/JSON wire formats are only built when a consumer asks for them.
+    """
+    jpeg: memoryview
+    frame_id: int
+    motion: float
+    timestamp: Optional[str] = None
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.jpeg).decode("ascii")
+
+    def to_json(self, **metadata) -> str:
+        return json.dumps({
+            "frame": self.to_base64(),
+            "frame_id": self.frame_id,
+            "motion": self.motion,
+            "timestamp": self.timestamp,
+            **metadata
+        })
+
+# ----------- Sequential Key Frame Extractor -----------
+def iter_key_frames(video_path: str, interval: float, motion_threshold: float, motion_mode: str = "absdiff"):
+    """Decode the video front to back and yield a FrameRecord for each sampled high-motion frame.
+
+    grab() advances the decoder without the BGR conversion and copy; retrieve()
+    only runs for frames on the sampling grid, and no seek (with its GOP
+    re-decode) is ever issued.
+    """
+    vidcap = cv2.VideoCapture(video_path)
+    try:
+        fps = vidcap.get(cv2.CAP_PROP_FPS) or 30
+        frame_interval = max(1, int(fps * interval))
+        scorer = MotionScorer(motion_mode)
+        frame_id = 0
+
+        while vidcap.grab():
+            if frame_id % frame_interval:
+                frame_id += 1
+                continue
+
+            success, frame = vidcap.retrieve()
+            if not success:
+                break
+
+            motion = scorer.score(frame)
+
+            if motion >= motion_threshold:
+                _, jpeg = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY])
+                yield FrameRecord(memoryview(jpeg.reshape(-1)), frame_id, motion)
+
+            frame_id += 1
+    finally:
+        vidcap.release()
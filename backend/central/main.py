@@ -1,10 +1,10 @@
 import asyncio
-import base64
-import cv2
-import numpy as np
 import aiofiles
 import concurrent.futures
-from fastapi import FastAPI, UploadFile, File, Form
+import multiprocessing
+from fastapi import FastAPI, Request, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from contextlib import asynccontextmanager
 import json
 import logging
@@ -12,16 +12,45 @@ import os
 import uuid
 from datetime import datetime
 import tempfile
+from typing import Optional
 import atexit
 import httpx  # ← Added for async HTTP calls
 
+from frame_extractor import FrameRecord, iter_key_frames
+from parallel_decode import iter_key_frames_parallel
+from motion import MOTION_MODES
+from pipeline import run_pipeline
+
 # ----------- Config -----------
 FRAME_INTERVAL = 5  # seconds
 MOTION_THRESHOLD = 20
+# "absdiff" scores a mean grey level; "ratio" and "mog2" score a fraction of changed pixels
+MOTION_THRESHOLDS = {"absdiff": MOTION_THRESHOLD, "ratio": 0.05, "mog2": 0.02}
+DEFAULT_MOTION_MODE = os.getenv("MOTION_MODE", "absdiff")
+CAMERA_MOTION_MODES = json.loads(os.getenv("CAMERA_MOTION_MODES", "{}"))  # e.g. {"cam-7": "mog2"}
 MAX_QUEUE_SIZE = 10  # for backpressure
+MAX_FRAMES_IN_FLIGHT = int(os.getenv("MAX_FRAMES_IN_FLIGHT", "8"))  # frames forwarded concurrently per upload
 
 ANOMALY_AGENT_URL = os.getenv("ANOMALY_AGENT_URL", "http://localhost:8003/detect-anomaly/")
 BOTTLENECK_AGENT_URL = os.getenv("BOTTLENECK_AGENT_URL", "http://localhost:8002/analyze-density/")
+ANOMALY_AGENT_CONCURRENCY = int(os.getenv("ANOMALY_AGENT_CONCURRENCY", "8"))  # across all uploads
+BOTTLENECK_AGENT_CONCURRENCY = int(os.getenv("BOTTLENECK_AGENT_CONCURRENCY", "4"))
+
+# ----------- HTTP Client Config -----------
+HTTP_TIMEOUT = 5.0
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "32"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "16"))
+HTTP_KEEPALIVE_EXPIRY = 30.0  # seconds an idle pooled connection is kept open
+
+for _mode in (DEFAULT_MOTION_MODE, *CAMERA_MOTION_MODES.values()):
+    if _mode not in MOTION_MODES:
+        raise ValueError(f"Unknown motion mode '{_mode}', expected one of {MOTION_MODES}")
+
+# ----------- Decode Mode -----------
+# "thread" decodes each upload sequentially on EXECUTOR; "process" splits long videos
+# into time segments decoded in parallel worker processes
+DECODE_MODE = os.getenv("DECODE_MODE", "thread")
+DECODE_PROCESSES = int(os.getenv("DECODE_PROCESSES", str(os.cpu_count() or 4)))
 
 # ----------- Logging Setup -----------
 logging.basicConfig(level=logging.INFO)
@@ -31,140 +60,174 @@ logger = logging.getLogger("central-service")
 EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count() or 4)
 atexit.register(EXECUTOR.shutdown, wait=False)
 
+# ----------- Process Pool (DECODE_MODE=process) -----------
+PROCESS_POOL = None
+if DECODE_MODE == "process":
+    # spawn, not fork: the parent is a threaded asyncio server
+    PROCESS_POOL = concurrent.futures.ProcessPoolExecutor(
+        max_workers=DECODE_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+    )
+    atexit.register(PROCESS_POOL.shutdown, wait=False)
+
 # ----------- Lifespan Handler -----------
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    yield
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    app.state.http_client = httpx.AsyncClient(timeout=HTTP_TIMEOUT, limits=limits)
+    try:
+        yield
+    finally:
+        await app.state.http_client.aclose()
 
 # ----------- FastAPI App -----------
 app = FastAPI(lifespan=lifespan)
 
-# ----------- Async Queue -----------
-frame_queue = asyncio.Queue(maxsize=MAX_QUEUE_SIZE)
-
-# ----------- Helper: Extract Frames -----------
-def extract_key_frames(video_path: str, interval: int, motion_threshold: int):
-    frames = []
-    vidcap = cv2.VideoCapture(video_path)
-    fps = vidcap.get(cv2.CAP_PROP_FPS) or 30
-    frame_interval = int(fps * interval)
-    success, prev = vidcap.read()
-    frame_id = 0
-
-    while success:
-        vidcap.set(cv2.CAP_PROP_POS_FRAMES, frame_id)
-        success, frame = vidcap.read()
-        if not success:
-            break
-
-        # 🔽 Downscale for motion detection
-        small_frame = cv2.resize(frame, (320, 240))
-        gray = cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY)
-        prev_gray = cv2.cvtColor(cv2.resize(prev, (320, 240)), cv2.COLOR_BGR2GRAY)
-        diff = cv2.absdiff(prev_gray, gray)
-        motion = np.mean(diff)
-
-        if motion >= motion_threshold:
-            # 📦 Compress frame
-            _, jpeg = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-            frames.append((jpeg.tobytes(), frame_id, motion))
-
-        prev = frame
-        frame_id += frame_interval
-
-    vidcap.release()
-    return frames
-
-# ----------- Async Video Processor -----------
-async def process_video_async(video_path, interval, threshold):
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(EXECUTOR, extract_key_frames, video_path, interval, threshold)
-
-# ----------- Helper: Encode Frame -----------
-def encode_frame(frame_bytes):
-    return base64.b64encode(frame_bytes).decode("utf-8")
-
-# ----------- Helper: Frame Metadata -----------
-def create_frame_payload(encoded_frame, frame_id, motion, camera_id, location, zone_id):
-    return json.dumps({
-        "frame": encoded_frame,
-        "frame_id": frame_id,
-        "motion": motion,
+# ----------- Per-Agent Concurrency Limits -----------
+ANOMALY_SEMAPHORE = asyncio.Semaphore(ANOMALY_AGENT_CONCURRENCY)
+BOTTLENECK_SEMAPHORE = asyncio.Semaphore(BOTTLENECK_AGENT_CONCURRENCY)
+
+async def post_limited(client, semaphore, url, data, files):
+    async with semaphore:
+        return await client.post(url, data=data, files=files)
+
+# ----------- Helper: Forward Frame to Agents -----------
+async def forward_frame(client, frame: FrameRecord, camera_id, location, zone_id):
+    frame.timestamp = datetime.utcnow().isoformat()
+
+    # httpx multipart needs bytes: materialise the JPEG once and share it between both agents
+    files = {"image": ("frame.jpg", bytes(frame.jpeg), "image/jpeg")}
+    form_data = {
         "camera_id": camera_id,
-        "location": location,
         "zone_id": zone_id,
-        "timestamp": datetime.utcnow().isoformat()
-    })
+        "location": location,
+        "motion_score": str(frame.motion)
+    }
+
+    anomaly_task = post_limited(client, ANOMALY_SEMAPHORE, ANOMALY_AGENT_URL, form_data, files)
+    bottleneck_task = post_limited(client, BOTTLENECK_SEMAPHORE, BOTTLENECK_AGENT_URL, form_data, files)
+
+    anomaly_resp, bottleneck_resp = await asyncio.gather(anomaly_task, bottleneck_task, return_exceptions=True)
+
+    result = {
+        "frame_id": frame.frame_id,
+        "motion": frame.motion,
+        "timestamp": frame.timestamp,
+        "anomaly_response": {},
+        "bottleneck_response": {}
+    }
+
+    if isinstance(anomaly_resp, Exception):
+        logger.error(f"[❌] Anomaly Agent error: {anomaly_resp}")
+        result["anomaly_response"] = {"error": str(anomaly_resp)}
+    else:
+        result["anomaly_response"] = anomaly_resp.json()
+
+    if isinstance(bottleneck_resp, Exception):
+        logger.error(f"[❌] Bottleneck Agent error: {bottleneck_resp}")
+        result["bottleneck_response"] = {"error": str(bottleneck_resp)}
+    else:
+        result["bottleneck_response"] = bottleneck_resp.json()
+
+    return result
+
+# ----------- Streaming Frame Pipeline -----------
+def remove_video(tmp_path):
+    try:
+        os.remove(tmp_path)
+    except FileNotFoundError:
+        pass
+
+async def stream_frame_results(client, tmp_path, camera_id, location, zone_id):
+    """Yield per-frame agent results, in frame order, while the video is still being decoded.
+
+    The caller owns the video file: streamed responses remove it in a BackgroundTask,
+    which also covers a client that disconnects before the body is iterated.
+    """
+    motion_mode = CAMERA_MOTION_MODES.get(camera_id, DEFAULT_MOTION_MODE)
+    if PROCESS_POOL is not None:
+        frames = iter_key_frames_parallel(
+            tmp_path, FRAME_INTERVAL, MOTION_THRESHOLDS[motion_mode], motion_mode,
+            pool=PROCESS_POOL, workers=DECODE_PROCESSES,
+        )
+    else:
+        frames = iter_key_frames(tmp_path, FRAME_INTERVAL, MOTION_THRESHOLDS[motion_mode], motion_mode)
+    async for result in run_pipeline(
+        frames,
+        lambda frame: forward_frame(client, frame, camera_id, location, zone_id),
+        executor=EXECUTOR,
+        queue_size=MAX_QUEUE_SIZE,
+        window=MAX_FRAMES_IN_FLIGHT,
+    ):
+        yield result
+
+def _format_ndjson(results, tmp_path):
+    async def body():
+        try:
+            async for result in results:
+                yield json.dumps(result) + "\n"
+        finally:
+            remove_video(tmp_path)  # servers that raise on disconnect skip the background task
+    return StreamingResponse(body(), media_type="application/x-ndjson", background=BackgroundTask(remove_video, tmp_path))
+
+def _format_sse(results, tmp_path):
+    async def body():
+        count = 0
+        try:
+            async for result in results:
+                count += 1
+                yield f"event: frame\ndata: {json.dumps(result)}\n\n"
+            yield f"event: done\ndata: {json.dumps({'frames': count})}\n\n"
+        finally:
+            remove_video(tmp_path)  # servers that raise on disconnect skip the background task
+    return StreamingResponse(body(), media_type="text/event-stream", background=BackgroundTask(remove_video, tmp_path))
 
 # ----------- Main Endpoint: Upload Video and Forward Frames -----------
 @app.post("/upload")
 async def upload_video(
+    request: Request,
     video: UploadFile = File(...),
     camera_id: str = Form(...),
     location: str = Form(...),
-    zone_id: str = Form(...)
+    zone_id: str = Form(...),
+    stream: Optional[str] = Form(None)  # "ndjson" or "sse" to receive per-frame results as they arrive
 ):
+    if stream not in (None, "ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="stream must be 'ndjson' or 'sse'")
+
     tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
     tmp_path = tmp_file.name
     tmp_file.close()
 
-    async with aiofiles.open(tmp_path, 'wb') as tmp:
-        while True:
-            chunk = await video.read(1024 * 1024)
-            if not chunk:
-                break
-            await tmp.write(chunk)
+    try:
+        async with aiofiles.open(tmp_path, 'wb') as tmp:
+            while True:
+                chunk = await video.read(1024 * 1024)
+                if not chunk:
+                    break
+                await tmp.write(chunk)
+    except BaseException:
+        remove_video(tmp_path)
+        raise
 
     logger.info(f"[📦] Video saved to {tmp_path}")
 
-    frames = await process_video_async(tmp_path, FRAME_INTERVAL, MOTION_THRESHOLD)
-    logger.info(f"[✅] Extracted {len(frames)} motion frames")
-
-    os.remove(tmp_path)
-
-    results = []
-
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        for frame_bytes, frame_id, motion in frames:
-            encoded = encode_frame(frame_bytes)
-            payload = create_frame_payload(encoded, frame_id, motion, camera_id, location, zone_id)
-            payload_dict = json.loads(payload)
-
-            files = {"image": ("frame.jpg", frame_bytes, "image/jpeg")}
-            form_data = {
-                "camera_id": camera_id,
-                "zone_id": zone_id,
-                "location": location
-            }
-
-            anomaly_task = client.post(ANOMALY_AGENT_URL, data=form_data, files=files)
-            bottleneck_task = client.post(BOTTLENECK_AGENT_URL, data=form_data, files=files)
-
-            anomaly_resp, bottleneck_resp = await asyncio.gather(anomaly_task, bottleneck_task, return_exceptions=True)
-
-            result = {
-                "frame_id": frame_id,
-                "motion": motion,
-                "timestamp": payload_dict["timestamp"],
-                "anomaly_response": {},
-                "bottleneck_response": {}
-            }
-
-            if isinstance(anomaly_resp, Exception):
-                logger.error(f"[❌] Anomaly Agent error: {anomaly_resp}")
-                result["anomaly_response"] = {"error": str(anomaly_resp)}
-            else:
-                result["anomaly_response"] = anomaly_resp.json()
-
-            if isinstance(bottleneck_resp, Exception):
-                logger.error(f"[❌] Bottleneck Agent error: {bottleneck_resp}")
-                result["bottleneck_response"] = {"error": str(bottleneck_resp)}
-            else:
-                result["bottleneck_response"] = bottleneck_resp.json()
+    results = stream_frame_results(request.app.state.http_client, tmp_path, camera_id, location, zone_id)
+    if stream == "ndjson":
+        return _format_ndjson(results, tmp_path)
+    if stream == "sse":
+        return _format_sse(results, tmp_path)
 
-            results.append(result)
+    try:
+        collected = [result async for result in results]
+    finally:
+        remove_video(tmp_path)
+    logger.info(f"[✅] Forwarded {len(collected)} motion frames")
 
     return {
-        "message": f"Processed and forwarded {len(frames)} high-motion frames.",
-        "results": results
+        "message": f"Processed and forwarded {len(collected)} high-motion frames.",
+        "results": collected
     }
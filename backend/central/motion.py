@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+
+# ----------- Config -----------
+MOTION_SIZE = (320, 240)
+PIXEL_CHANGE_THRESHOLD = 25  # grey levels a pixel must move to count as changed in "ratio" mode
+
+MOTION_MODES = ("absdiff", "ratio", "mog2")
+
+# ----------- Motion Scorer -----------
+class MotionScorer:
+    """Scores motion between consecutive sampled frames of one stream.
+
+    Modes:
+    - "absdiff": mean absolute grey-level difference (0-255)
+    - "ratio":   fraction of pixels that changed by more than PIXEL_CHANGE_THRESHOLD (0-1)
+    - "mog2":    fraction of pixels flagged foreground by a MOG2 background subtractor (0-1)
+
+    The downscaled grayscale of the previous frame is kept between calls and every
+    intermediate image is written into buffers allocated once per scorer.
+    """
+
+    def __init__(self, mode: str = "absdiff", size=MOTION_SIZE, pixel_threshold: int = PIXEL_CHANGE_THRESHOLD):
+        if mode not in MOTION_MODES:
+            raise ValueError(f"Unknown motion mode '{mode}', expected one of {MOTION_MODES}")
+        self.mode = mode
+        self.size = size
+        self.pixel_threshold = pixel_threshold
+
+        width, height = size
+        self._area = width * height
+        self._small = np.empty((height, width, 3), dtype=np.uint8)
+        self._gray = np.empty((height, width), dtype=np.uint8)
+        self._prev_gray = np.empty((height, width), dtype=np.uint8)
+        self._diff = np.empty((height, width), dtype=np.uint8)
+        self._mask = np.empty((height, width), dtype=np.uint8)
+        self._has_prev = False
+        self._subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False) if mode == "mog2" else None
+
+    def score(self, frame: np.ndarray) -> float:
+        cv2.resize(frame, self.size, dst=self._small)
+
+        if self.mode == "mog2":
+            self._subtractor.apply(self._small, fgmask=self._mask)
+            return cv2.countNonZero(self._mask) / self._area
+
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        if not self._has_prev:
+            # First sample is compared against itself
+            self._gray, self._prev_gray = self._prev_gray, self._gray
+            self._has_prev = True
+            return 0.0
+
+        cv2.absdiff(self._prev_gray, self._gray, dst=self._diff)
+        if self.mode == "absdiff":
+            motion = cv2.mean(self._diff)[0]
+        else:
+            cv2.threshold(self._diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=self._mask)
+            motion = cv2.countNonZero(self._mask) / self._area
+
+        # Swap buffers so this frame's grayscale becomes the next call's reference
+        self._gray, self._prev_gray = self._prev_gray, self._gray
+        return motion
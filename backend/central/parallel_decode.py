@@ -0,0 +1,124 @@
+import math
+from multiprocessing import resource_tracker, shared_memory
+
+import cv2
+
+from frame_extractor import JPEG_QUALITY, FrameRecord
+from motion import MotionScorer
+
+# ----------- Config -----------
+MIN_SEGMENT_SECONDS = 30  # shorter segments cost more in worker start-up and seeking than they save
+
+# ----------- Shared Memory Helpers -----------
+def _release(shm_name):
+    if shm_name is None:
+        return
+    shm = shared_memory.SharedMemory(name=shm_name)
+    shm.close()
+    shm.unlink()
+
+def _release_future(future):
+    if not future.cancelled() and future.exception() is None:
+        _release(future.result()[0])
+
+# ----------- Worker (runs in a child process) -----------
+def _decode_segment(video_path, start, end, frame_interval, motion_threshold, motion_mode):
+    """Decode frames [start, end) and pack the sampled JPEGs into one shared memory block.
+
+    Returns (shm_name, [(offset, length, frame_id, motion), ...]); shm_name is None
+    when nothing passed the motion gate. The caller owns (and must unlink) the block.
+    """
+    vidcap = cv2.VideoCapture(video_path)
+    scorer = MotionScorer(motion_mode)
+    jpegs = []
+    try:
+        # Start one sample early so the first motion score in the segment has its real reference frame
+        frame_id = max(0, start - frame_interval)
+        if frame_id:
+            vidcap.set(cv2.CAP_PROP_POS_FRAMES, frame_id)
+
+        while (end is None or frame_id < end) and vidcap.grab():
+            if frame_id % frame_interval == 0:
+                success, frame = vidcap.retrieve()
+                if not success:
+                    break
+                motion = scorer.score(frame)
+                if frame_id >= start and motion >= motion_threshold:
+                    _, jpeg = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY])
+                    jpegs.append((jpeg, frame_id, motion))
+            frame_id += 1
+    finally:
+        vidcap.release()
+
+    if not jpegs:
+        return None, []
+
+    shm = shared_memory.SharedMemory(create=True, size=sum(jpeg.size for jpeg, _, _ in jpegs))
+    records = []
+    offset = 0
+    for jpeg, frame_id, motion in jpegs:
+        shm.buf[offset:offset + jpeg.size] = jpeg.reshape(-1)
+        records.append((offset, jpeg.size, frame_id, motion))
+        offset += jpeg.size
+    shm.close()
+    # Ownership passes to the parent, which unlinks the block once the frames are read
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm.name, records
+
+# ----------- Segment Planning -----------
+def plan_segments(frame_count: int, fps: float, interval: float, workers: int):
+    """Split [0, frame_count) into sample-aligned (start, end) ranges; the last range runs to EOF."""
+    frame_interval = max(1, int(fps * interval))
+    if frame_count <= 0:
+        # Unknown length (some containers do not report it): decode in one piece
+        return frame_interval, [(0, None)]
+
+    min_frames = int(fps * MIN_SEGMENT_SECONDS)
+    segment = max(min_frames, math.ceil(frame_count / max(1, workers)))
+    segment = math.ceil(segment / frame_interval) * frame_interval
+
+    starts = list(range(0, frame_count, segment))
+    segments = [(s, s + segment) for s in starts[:-1]] + [(starts[-1], None)]
+    return frame_interval, segments
+
+# ----------- Parallel Key Frame Extractor -----------
+def iter_key_frames_parallel(video_path: str, interval: float, motion_threshold: float, motion_mode: str = "absdiff",
+                             *, pool, workers: int):
+    """Same output as frame_extractor.iter_key_frames, decoded as time segments across a process pool.
+
+    Segments are yielded strictly in frame order. "mog2" scores differ slightly from a
+    sequential decode because each segment learns its own background model.
+    """
+    vidcap = cv2.VideoCapture(video_path)
+    fps = vidcap.get(cv2.CAP_PROP_FPS) or 30
+    frame_count = int(vidcap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    vidcap.release()
+
+    frame_interval, segments = plan_segments(frame_count, fps, interval, workers)
+    futures = [
+        pool.submit(_decode_segment, video_path, start, end, frame_interval, motion_threshold, motion_mode)
+        for start, end in segments
+    ]
+
+    consumed = 0
+    try:
+        for future in futures:
+            shm_name, records = future.result()
+            consumed += 1
+            if shm_name is None:
+                continue
+            shm = shared_memory.SharedMemory(name=shm_name)
+            try:
+                # One copy per segment out of the block; every frame is then a view into it
+                offset, length = records[-1][:2]
+                segment = memoryview(bytes(shm.buf[:offset + length]))
+            finally:
+                shm.close()
+                shm.unlink()
+            for offset, length, frame_id, motion in records:
+                yield FrameRecord(segment[offset:offset + length], frame_id, motion)
+    finally:
+        # Abandoned early (client went away or a worker failed): free whatever the rest produce
+        for future in futures[consumed:]:
+            if not future.cancel():
+                future.add_done_callback(_release_future)
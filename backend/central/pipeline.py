@@ -0,0 +1,86 @@
+import asyncio
+import concurrent.futures
+import threading
+
+# ----------- Config -----------
+PUT_POLL_INTERVAL = 0.5  # seconds between stop checks while the decoder is blocked on a full queue
+
+_DONE = object()
+
+# ----------- Producer (executor side) -----------
+def _put_blocking(frame_queue: asyncio.Queue, item, loop, stop: threading.Event) -> bool:
+    future = asyncio.run_coroutine_threadsafe(frame_queue.put(item), loop)
+    while True:
+        try:
+            future.result(timeout=PUT_POLL_INTERVAL)
+            return True
+        except concurrent.futures.TimeoutError:
+            if stop.is_set():
+                future.cancel()
+                return False
+
+def _produce(frames, frame_queue: asyncio.Queue, loop, stop: threading.Event):
+    """Drain the frame iterator into the bounded queue; the decoder stalls while consumers are behind."""
+    try:
+        for seq, item in enumerate(frames):
+            if stop.is_set() or not _put_blocking(frame_queue, (seq, item), loop, stop):
+                return
+    finally:
+        if not stop.is_set():
+            _put_blocking(frame_queue, _DONE, loop, stop)
+
+# ----------- Pipeline -----------
+async def run_pipeline(frames, forward, *, executor, queue_size: int, window: int):
+    """Decode `frames` on `executor` and yield `await forward(frame)` results in decode order.
+
+    Up to `window` frames are forwarded concurrently. A slot is only freed once its
+    result has been yielded, so a slow frame at the head bounds the reorder buffer.
+    """
+    loop = asyncio.get_running_loop()
+    frame_queue = asyncio.Queue(maxsize=queue_size)
+    result_queue = asyncio.Queue()
+    slots = asyncio.Semaphore(window)
+    stop = threading.Event()
+
+    async def consume():
+        while True:
+            await slots.acquire()
+            item = await frame_queue.get()
+            if item is _DONE:
+                # Hand the sentinel on so every sibling consumer shuts down too
+                slots.release()
+                await frame_queue.put(_DONE)
+                return
+            seq, frame = item
+            await result_queue.put((seq, await forward(frame)))
+
+    async def supervise():
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            await result_queue.put(_DONE)
+
+    producer = loop.run_in_executor(executor, _produce, frames, frame_queue, loop, stop)
+    workers = [asyncio.create_task(consume()) for _ in range(window)]
+    supervisor = asyncio.create_task(supervise())
+    pending = {}
+    next_seq = 0
+    try:
+        while True:
+            item = await result_queue.get()
+            if item is _DONE:
+                break
+            seq, result = item
+            pending[seq] = result
+            while next_seq in pending:
+                yield pending.pop(next_seq)
+                next_seq += 1
+                slots.release()
+        await supervisor
+        await producer
+    finally:
+        stop.set()
+        for task in (*workers, supervisor):
+            task.cancel()
+        # Let the decoder thread observe the stop flag before the caller removes the video file
+        await asyncio.gather(producer, supervisor, *workers, return_exceptions=True)
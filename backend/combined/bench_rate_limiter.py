@@ -0,0 +1,61 @@
+import argparse
+import random
+import time
+import tracemalloc
+
+from rate_limiter import ALGORITHMS, RateLimiter
+
+# ----------- Baseline -----------
+class ListWindowLimiter:
+    """The combiner's previous approach: a timestamp list per key, filtered on every check."""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.calls = {}
+
+    def allow(self, key, zone=None, now=None) -> bool:
+        window = [t for t in self.calls.setdefault(key, []) if now - t < self.window]
+        self.calls[key] = window
+        if len(window) >= self.limit:
+            return False
+        window.append(now)
+        return True
+
+# ----------- Main -----------
+def main():
+    parser = argparse.ArgumentParser(description="Cost per rate-limit check with many live keys.")
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--checks", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--window", type=float, default=60.0)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    keys = [(f"CAM{i:06d}", f"Zone{i % 100}") for i in range(args.keys)]
+    sequence = [keys[rng.randrange(args.keys)] for _ in range(args.checks)]
+    # Simulated clock: the whole run spans two windows so window roll-over is exercised
+    step = 2 * args.window / args.checks
+
+    limiters = {"list (old)": ListWindowLimiter(args.limit, args.window)}
+    for algorithm in ALGORITHMS:
+        limiters[algorithm] = RateLimiter(algorithm, limit=args.limit, window=args.window,
+                                          max_idle=10 * args.window)
+
+    print(f"{'limiter':>16} {'keys':>8} {'bytes/key':>10} {'ns/check':>10} {'limited':>8}")
+    for label, limiter in limiters.items():
+        tracemalloc.start()
+        for key in keys:  # populate every key before timing
+            limiter.allow(key, key[1], 0.0)
+        bytes_per_key = tracemalloc.get_traced_memory()[0] / args.keys
+        tracemalloc.stop()
+        limited = 0
+        start = time.perf_counter()
+        for i, key in enumerate(sequence):
+            if not limiter.allow(key, key[1], i * step):
+                limited += 1
+        elapsed = time.perf_counter() - start
+        print(f"{label:>16} {args.keys:>8} {bytes_per_key:>10.0f} {elapsed / args.checks * 1e9:>10.0f} {limited:>8}")
+
+if __name__ == "__main__":
+    main()
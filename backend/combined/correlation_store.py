@@ -0,0 +1,158 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Hashable, Optional
+
+KINDS = ("anomaly", "bottleneck")
+_PARTNER = {"anomaly": "bottleneck", "bottleneck": "anomaly"}
+
+# ----------- Shard -----------
+class _Shard:
+    __slots__ = ("lock", "pending", "live", "heap")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}  # key -> {kind: [(timestamp, seq, payload)]}
+        self.live = {}  # seq -> (key, kind) for every entry still waiting for a partner
+        self.heap = []  # (expires_at, seq); entries removed by a match stay here until popped
+
+# ----------- Correlation Store -----------
+class CorrelationStore:
+    """Pairs anomaly and bottleneck readings for the same key whose timestamps are within `tolerance` seconds.
+
+    Unmatched readings expire `ttl` seconds after they arrive. Expiry pops a per-shard
+    heap instead of scanning; entries consumed by a match are deleted lazily when their
+    heap item surfaces. Each shard holds at most `max_entries / shards` waiting readings
+    and evicts the oldest beyond that. Keys are spread over `shards` independently locked
+    shards so concurrent handlers on different cameras rarely contend.
+    """
+
+    def __init__(self, *, tolerance: float = 5.0, ttl: float = 60.0, max_entries: int = 100_000, shards: int = 64):
+        self.tolerance = tolerance
+        self.ttl = ttl
+        self.shards = [_Shard() for _ in range(shards)]
+        self.max_per_shard = max(1, -(-max_entries // shards))
+        self._seq = itertools.count()  # next() on a count is atomic under the GIL
+        self._stats_lock = threading.Lock()
+        self.matched = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _shard(self, key: Hashable) -> _Shard:
+        return self.shards[hash(key) % len(self.shards)]
+
+    def add(self, kind: str, key: Hashable, timestamp: float, payload) -> Optional[tuple]:
+        """Store a reading, or consume its closest partner within tolerance.
+
+        Returns (anomaly_payload, bottleneck_payload) on a match, else None.
+        """
+        if kind not in _PARTNER:
+            raise ValueError(f"Unknown reading kind '{kind}', expected one of {KINDS}")
+        now = time.monotonic()
+        shard = self._shard(key)
+        with shard.lock:
+            expired = self._expire_locked(shard, now)
+            readings = shard.pending.setdefault(key, {})
+
+            partner = self._take_closest(shard, key, readings.get(_PARTNER[kind]), timestamp)
+            if partner is not None:
+                self._drop_key_if_empty(shard, key)
+                self._count(expired=expired, matched=1)
+                return (payload, partner) if kind == "anomaly" else (partner, payload)
+
+            seq = next(self._seq)
+            readings.setdefault(kind, []).append((timestamp, seq, payload))
+            shard.live[seq] = (key, kind)
+            heapq.heappush(shard.heap, (now + self.ttl, seq))
+            evicted = 0
+            while len(shard.live) > self.max_per_shard:
+                evicted += self._pop_oldest_locked(shard)
+            self._compact_locked(shard)
+        self._count(expired=expired, evicted=evicted)
+        return None
+
+    def expire(self) -> int:
+        """Drop every reading past its TTL; cheap enough to call from a periodic task."""
+        now = time.monotonic()
+        total = 0
+        for shard in self.shards:
+            with shard.lock:
+                total += self._expire_locked(shard, now)
+        self._count(expired=total)
+        return total
+
+    def __len__(self) -> int:
+        return sum(len(shard.live) for shard in self.shards)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self),
+            "keys": sum(len(shard.pending) for shard in self.shards),
+            "heap_items": sum(len(shard.heap) for shard in self.shards),
+            "matched": self.matched,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "max_entries": self.max_per_shard * len(self.shards),
+        }
+
+    # ----------- Internals (shard lock held) -----------
+    def _take_closest(self, shard: _Shard, key, candidates, timestamp: float):
+        if not candidates:
+            return None
+        best, best_gap = None, self.tolerance
+        for i, (ts, _, _) in enumerate(candidates):
+            gap = abs(ts - timestamp)
+            if gap <= best_gap:
+                best, best_gap = i, gap
+        if best is None:
+            return None
+        _, seq, payload = candidates.pop(best)
+        del shard.live[seq]
+        return payload
+
+    def _remove_locked(self, shard: _Shard, seq: int):
+        key, kind = shard.live.pop(seq)
+        readings = shard.pending[key]
+        readings[kind] = [entry for entry in readings[kind] if entry[1] != seq]
+        if not readings[kind]:
+            del readings[kind]
+        self._drop_key_if_empty(shard, key)
+
+    @staticmethod
+    def _drop_key_if_empty(shard: _Shard, key):
+        readings = shard.pending.get(key)
+        if readings is not None and not any(readings.values()):
+            del shard.pending[key]
+
+    def _expire_locked(self, shard: _Shard, now: float) -> int:
+        expired = 0
+        while shard.heap and shard.heap[0][0] <= now:
+            _, seq = heapq.heappop(shard.heap)
+            if seq in shard.live:
+                self._remove_locked(shard, seq)
+                expired += 1
+        return expired
+
+    def _pop_oldest_locked(self, shard: _Shard) -> int:
+        # TTL is uniform, so the earliest expiry is also the oldest arrival
+        while shard.heap:
+            _, seq = heapq.heappop(shard.heap)
+            if seq in shard.live:
+                self._remove_locked(shard, seq)
+                return 1
+        return 0
+
+    @staticmethod
+    def _compact_locked(shard: _Shard):
+        # Matched entries leave tombstones in the heap; rebuild once they dominate it
+        if len(shard.heap) > 64 and len(shard.heap) > 2 * len(shard.live):
+            shard.heap = [item for item in shard.heap if item[1] in shard.live]
+            heapq.heapify(shard.heap)
+
+    def _count(self, matched: int = 0, expired: int = 0, evicted: int = 0):
+        if matched or expired or evicted:
+            with self._stats_lock:
+                self.matched += matched
+                self.expired += expired
+                self.evicted += evicted
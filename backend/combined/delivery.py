@@ -0,0 +1,290 @@
+import asyncio
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Callable, Optional
+
+import httpx
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # backend/, home of the shared `common` package
+from common.batching import collect_batch
+from common.spill import SpillFile
+
+logger = logging.getLogger("combined-service.delivery")
+
+# ----------- Destinations -----------
+class Destination:
+    """A downstream service. Events are POSTed one per request to `url`, or as a JSON list to `batch_url` if set.
+
+    `timeout` overrides the manager's default; set it above the service's own deadline,
+    or a slow success is retried and processed twice.
+    """
+
+    def __init__(self, name: str, url: str, batch_url: Optional[str] = None,
+                 transform: Optional[Callable[[dict], dict]] = None, timeout: Optional[float] = None):
+        self.name = name
+        self.url = url
+        self.batch_url = batch_url
+        self.transform = transform or (lambda event: event)
+        self.timeout = timeout
+
+class DestinationStats:
+    """Counters and recent delivery lag (time from submit to a successful POST) for one destination."""
+
+    def __init__(self, window: int = 512):
+        self.delivered = 0
+        self.retries = 0
+        self.rejected = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.dropped = 0
+        self._lag_ms = deque(maxlen=window)
+
+    def record_lag(self, lag_ms: float):
+        self._lag_ms.append(lag_ms)
+
+    @staticmethod
+    def _percentile(ordered, pct: float) -> float:
+        if not ordered:
+            return 0.0
+        return round(ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))], 2)
+
+    def snapshot(self) -> dict:
+        lags = sorted(self._lag_ms)
+        return {
+            "delivered": self.delivered,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "dropped": self.dropped,
+            "lag_ms": {
+                "p50": self._percentile(lags, 50),
+                "p95": self._percentile(lags, 95),
+                "max": self._percentile(lags, 100),
+            },
+        }
+
+# ----------- Delivery Manager -----------
+class DeliveryManager:
+    """Fans combined events out to downstream services without blocking ingest.
+
+    `submit` only enqueues (and may be called from any thread). Each destination has
+    its own bounded queue and worker, which sends up to `batch_size` events at a time
+    after lingering `linger_ms` for batch-mates. Failed sends are retried with
+    exponential backoff and jitter; events that still fail, or that arrive while a
+    queue is full, go to the spill log and are replayed once the queue drains; the
+    log is written off the event loop. Spilled events for a destination that is no
+    longer configured are dropped on replay, logged and counted in the snapshot's
+    `dropped_unconfigured`. 4xx responses other than 429 are not retried.
+    """
+
+    def __init__(self, destinations, *, batch_size: int = 50, linger_ms: float = 50, max_queue: int = 10000,
+                 max_attempts: int = 5, base_delay: float = 0.5, max_delay: float = 30.0,
+                 spill_path: Path = Path("delivery_spill.jsonl"), spill_max_bytes: int = 64 * 1024 * 1024,
+                 replay_interval: float = 5.0, timeout: float = 10.0, max_connections: int = 20):
+        self.destinations = {d.name: d for d in destinations}
+        self.batch_size = batch_size
+        self.linger = linger_ms / 1000
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.spill = SpillFile(spill_path, spill_max_bytes)  # {"destination", "event"} records
+        self.replay_interval = replay_interval
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.stats = {name: DestinationStats() for name in self.destinations}
+        self.unconfigured = Counter()  # spilled events dropped on replay because their destination was removed
+        self._queues = {}
+        self._in_flight = {name: [] for name in self.destinations}  # batch each worker is currently sending
+        self._tasks = []
+        self._spills = set()  # spill writes started from _enqueue
+        self._client = None
+        self._loop = None
+        self._loop_thread = None
+
+    # ----------- Lifecycle -----------
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        self._client = httpx.AsyncClient(limits=limits, timeout=self.timeout)
+        for name in self.destinations:
+            self._queues[name] = asyncio.Queue(maxsize=self.max_queue)
+            self._tasks.append(asyncio.create_task(self._worker(name)))
+        self._tasks.append(asyncio.create_task(self._replayer()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._spills, return_exceptions=True)
+        self._tasks.clear()
+        # Whatever is still queued survives the restart in the spill log
+        for name, queue in self._queues.items():
+            payloads = []
+            while not queue.empty():
+                payloads.append(queue.get_nowait()[1])
+            await self._spill(name, payloads)
+        await self._client.aclose()
+
+    # ----------- Ingest Side -----------
+    def submit(self, event: dict):
+        """Queue an event for every destination; never blocks. Safe to call from worker threads."""
+        if self._loop is None:
+            raise RuntimeError("DeliveryManager.submit() called before start()")
+        if threading.get_ident() == self._loop_thread:
+            self._enqueue(event)
+        else:
+            self._loop.call_soon_threadsafe(self._enqueue, event)
+
+    def _enqueue(self, event: dict):
+        now = time.monotonic()
+        for name, destination in self.destinations.items():
+            payload = destination.transform(event)
+            try:
+                self._queues[name].put_nowait((now, payload))
+            except asyncio.QueueFull:
+                task = asyncio.ensure_future(self._spill(name, [payload]))
+                self._spills.add(task)
+                task.add_done_callback(self._spills.discard)
+
+    async def _spill(self, name: str, payloads):
+        if not payloads:
+            return
+        records = [{"destination": name, "event": payload} for payload in payloads]
+        written = await asyncio.to_thread(self.spill.append, records)
+        self.stats[name].spilled += written
+        if written < len(payloads):
+            self.stats[name].dropped += len(payloads) - written
+            logger.error(f"[{name}] Spill log full, dropping {len(payloads) - written} events")
+
+    # ----------- Delivery Side -----------
+
+    async def _worker(self, name: str):
+        destination = self.destinations[name]
+        queue = self._queues[name]
+        while True:
+            batch = self._in_flight[name] = []
+            try:
+                # Collected in place, so items dequeued before a cancel are spilled too
+                await collect_batch(queue, self.batch_size, self.linger, batch)
+                await self._deliver(destination, batch)
+            except asyncio.CancelledError:
+                # Only the undelivered remainder is kept; see _deliver
+                await self._spill(name, [payload for _, payload in batch])
+                batch.clear()
+                raise
+
+    async def _deliver(self, destination: Destination, batch):
+        """Send with retries; `batch` is trimmed in place to what is still undelivered."""
+        stats = self.stats[destination.name]
+        for attempt in range(1, self.max_attempts + 1):
+            batch[:] = await self._send(destination, batch)
+            if not batch:
+                return
+            if attempt < self.max_attempts:
+                stats.retries += len(batch)
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+                logger.warning(f"[{destination.name}] {len(batch)} events failed (attempt {attempt}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+        logger.error(f"[{destination.name}] Giving up on {len(batch)} events after {self.max_attempts} attempts, spilling")
+        await self._spill(destination.name, [payload for _, payload in batch])
+        batch.clear()
+
+    async def _send(self, destination: Destination, batch):
+        """POST the batch; returns the items that should be retried."""
+        if destination.batch_url:
+            outcome = await self._post(destination, destination.batch_url, [payload for _, payload in batch])
+            outcomes = [outcome] * len(batch)
+        else:
+            outcomes = await asyncio.gather(*(self._post(destination, destination.url, payload) for _, payload in batch))
+
+        stats = self.stats[destination.name]
+        now = time.monotonic()
+        retry = []
+        for item, outcome in zip(batch, outcomes):
+            if outcome == "ok":
+                stats.delivered += 1
+                stats.record_lag((now - item[0]) * 1000)
+            elif outcome == "retry":
+                retry.append(item)
+        return retry
+
+    async def _post(self, destination: Destination, url: str, body) -> str:
+        try:
+            timeout = destination.timeout if destination.timeout is not None else httpx.USE_CLIENT_DEFAULT
+            resp = await self._client.post(url, json=body, timeout=timeout)
+        except httpx.HTTPError as e:
+            logger.warning(f"[{destination.name}] POST failed: {e!r}")
+            return "retry"
+        if resp.status_code < 400:
+            return "ok"
+        if resp.status_code == 429 or resp.status_code >= 500:
+            return "retry"
+        self.stats[destination.name].rejected += 1
+        logger.error(f"[{destination.name}] Rejected with {resp.status_code}: {resp.text[:200]}")
+        return "rejected"
+
+    async def _replayer(self):
+        while True:
+            await asyncio.sleep(self.replay_interval)
+            # Replay only once every queue has room for a sizeable share of the backlog
+            if any(q.qsize() > self.max_queue // 2 for q in self._queues.values()):
+                continue
+            records = await asyncio.to_thread(self.spill.take)
+            if not records:
+                continue
+            logger.info(f"Replaying {len(records)} spilled events")
+            now = time.monotonic()
+            leftover = []
+            unconfigured = Counter()
+            for record in records:
+                name = record["destination"]
+                if name not in self._queues:
+                    unconfigured[name] += 1
+                    continue
+                try:
+                    self._queues[name].put_nowait((now, record["event"]))
+                    self.stats[name].replayed += 1
+                except asyncio.QueueFull:
+                    leftover.append(record)
+            for name, count in unconfigured.items():
+                logger.error(f"[{name}] Dropping {count} spilled events: destination is no longer configured")
+            self.unconfigured.update(unconfigured)
+            if leftover:
+                written = await asyncio.to_thread(self.spill.append, leftover)
+                for record in leftover[written:]:
+                    self.stats[record["destination"]].dropped += 1
+                if written < len(leftover):
+                    logger.error(f"Spill log full, dropping {len(leftover) - written} replayed events")
+            await asyncio.to_thread(self.spill.done)
+
+    # ----------- Metrics -----------
+    def _oldest_age_ms(self, name: str, now: float) -> float:
+        # The in-flight batch is older than anything still queued
+        oldest = [item[0] for item in self._in_flight[name][:1]]
+        queue = self._queues.get(name)
+        if queue is not None and queue.qsize():
+            oldest.append(queue._queue[0][0])
+        return round((now - min(oldest)) * 1000, 2) if oldest else 0.0
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        return {
+            "spill_bytes": self.spill.size,
+            "dropped_unconfigured": dict(self.unconfigured),
+            "destinations": {
+                name: {
+                    "queue_depth": self._queues[name].qsize() if name in self._queues else 0,
+                    "in_flight": len(self._in_flight[name]),
+                    "oldest_pending_ms": self._oldest_age_ms(name, now),
+                    **self.stats[name].snapshot(),
+                }
+                for name in self.destinations
+            },
+        }
@@ -0,0 +1,134 @@
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime
+
+import httpx
+
+# ----------- Synthetic Readings -----------
+def reading_pair(run_id: str, i: int):
+    """An anomaly and a bottleneck reading that correlate; each pair gets its own camera so rate limits never trigger."""
+    now = datetime.utcnow().isoformat() + "Z"
+    camera_id = f"LG-{run_id}-{i}"
+    anomaly = {
+        "kind": "anomaly", "camera_id": camera_id, "location": "Load Test", "zone_id": "LoadZone",
+        "threats": [{"label": "smoke", "confidence": 0.7}], "model_version": "loadgen", "timestamp": now,
+    }
+    bottleneck = {
+        "kind": "bottleneck", "camera_id": camera_id, "location": "Load Test", "zone_id": "LoadZone",
+        "crowd_density": "high", "analyzed_at": now,
+    }
+    return anomaly, bottleneck
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))] if ordered else 0.0
+
+# ----------- Modes -----------
+# Latency is measured per pair: from sending its second reading to receiving its combined event.
+
+async def run_post(client: httpx.AsyncClient, base_url: str, pairs: int, concurrency: int, run_id: str):
+    """The existing path: one POST per reading."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, combined = [], 0
+
+    async def send_pair(i: int):
+        nonlocal combined
+        anomaly, bottleneck = reading_pair(run_id, i)
+        async with semaphore:
+            await client.post(f"{base_url}/from-anomaly", json=anomaly)
+            start = time.perf_counter()
+            resp = await client.post(f"{base_url}/from-bottleneck", json=bottleneck)
+            latencies.append(time.perf_counter() - start)
+        if resp.json().get("status") == "combined":
+            combined += 1
+
+    await asyncio.gather(*(send_pair(i) for i in range(pairs)))
+    return combined, latencies
+
+async def run_ndjson(client: httpx.AsyncClient, base_url: str, pairs: int, concurrency: int, run_id: str,
+                     batch_size: int):
+    """Bulk path: NDJSON batches of interleaved readings, combined events streamed back."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, combined = [], 0
+
+    async def send_batch(first: int, last: int):
+        nonlocal combined
+        lines = []
+        for i in range(first, last):
+            lines.extend(json.dumps(r) for r in reading_pair(run_id, i))
+        async with semaphore:
+            start = time.perf_counter()
+            async with client.stream("POST", f"{base_url}/ingest", content="\n".join(lines)) as resp:
+                async for line in resp.aiter_lines():
+                    if line and json.loads(line)["type"] == "combined":
+                        latencies.append(time.perf_counter() - start)
+                        combined += 1
+
+    await asyncio.gather(*(send_batch(i, min(i + batch_size, pairs)) for i in range(0, pairs, batch_size)))
+    return combined, latencies
+
+async def run_websocket(ws_url: str, pairs: int, concurrency: int, run_id: str):
+    """Streaming path: `concurrency` WebSocket connections, each sending its share of readings."""
+    try:
+        import websockets
+    except ImportError as e:
+        raise SystemExit("--mode ws requires the websockets package") from e
+    latencies, combined = [], 0
+
+    async def connection(indices):
+        nonlocal combined
+        sent_at = {}
+        async with websockets.connect(ws_url) as ws:
+            async def receive():
+                nonlocal combined
+                for _ in indices:
+                    record = json.loads(await ws.recv())
+                    if record["type"] == "combined":
+                        latencies.append(time.perf_counter() - sent_at[record["event"]["camera_id"]])
+                        combined += 1
+
+            receiver = asyncio.create_task(receive())
+            for i in indices:
+                anomaly, bottleneck = reading_pair(run_id, i)
+                await ws.send(json.dumps(anomaly))
+                sent_at[bottleneck["camera_id"]] = time.perf_counter()
+                await ws.send(json.dumps(bottleneck))
+            await receiver
+
+    await asyncio.gather(*(connection(range(c, pairs, concurrency)) for c in range(concurrency)))
+    return combined, latencies
+
+# ----------- Main -----------
+async def main():
+    parser = argparse.ArgumentParser(description="Drive the combiner with correlated readings and report events/s and latency.")
+    parser.add_argument("--url", default="http://localhost:8000", help="combiner base URL")
+    parser.add_argument("--mode", choices=["post", "ndjson", "ws"], action="append",
+                        help="ingest path to drive (repeatable; default: post and ndjson)")
+    parser.add_argument("--pairs", type=int, default=2000, help="anomaly/bottleneck pairs per mode")
+    parser.add_argument("--concurrency", type=int, default=16, help="in-flight requests or WebSocket connections")
+    parser.add_argument("--batch-size", type=int, default=200, help="pairs per NDJSON request")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    print(f"{'mode':>8} {'pairs':>7} {'combined':>9} {'readings/s':>11} {'p50 ms':>8} {'p99 ms':>8}")
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        for mode in args.mode or ["post", "ndjson"]:
+            run_id = uuid.uuid4().hex[:6]
+            start = time.perf_counter()
+            if mode == "post":
+                combined, latencies = await run_post(client, args.url, args.pairs, args.concurrency, run_id)
+            elif mode == "ndjson":
+                combined, latencies = await run_ndjson(client, args.url, args.pairs, args.concurrency, run_id,
+                                                       args.batch_size)
+            else:
+                ws_url = args.url.replace("http", "ws", 1) + "/ws/ingest"
+                combined, latencies = await run_websocket(ws_url, args.pairs, args.concurrency, run_id)
+            elapsed = time.perf_counter() - start
+            print(f"{mode:>8} {args.pairs:>7} {combined:>9} {2 * args.pairs / elapsed:>11.0f} "
+                  f"{_percentile(latencies, 50) * 1000:>8.1f} {_percentile(latencies, 99) * 1000:>8.1f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,26 +1,134 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
 from typing import Optional, Dict, Tuple, List
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
+from contextlib import asynccontextmanager
+import asyncio
+import json
 import uuid
 import logging
+import os
+import time
+
+from pathlib import Path
+
+from correlation_store import CorrelationStore
+from delivery import DeliveryManager, Destination
+from rate_limiter import RateLimiter
 
 # ---------------- Logging Setup ----------------
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("combined-service")
-app = FastAPI(title="Central Combiner Service")
+
+# ---------------- Correlation Config ----------------
+CORRELATION_TOLERANCE_SECONDS = float(os.getenv("CORRELATION_TOLERANCE_SECONDS", "5"))  # max timestamp gap for a pair
+CORRELATION_TTL_SECONDS = float(os.getenv("CORRELATION_TTL_SECONDS", "60"))  # unmatched readings are dropped after this
+CORRELATION_MAX_ENTRIES = int(os.getenv("CORRELATION_MAX_ENTRIES", "100000"))
+CORRELATION_SHARDS = int(os.getenv("CORRELATION_SHARDS", "64"))
+EXPIRY_SWEEP_SECONDS = float(os.getenv("EXPIRY_SWEEP_SECONDS", "1"))
+
+# ---------------- Rate Limit Config ----------------
+RATE_LIMIT_ALGORITHM = os.getenv("RATE_LIMIT_ALGORITHM", "sliding_window")  # or "token_bucket"
+COMBINE_RATE_LIMIT = int(os.getenv("COMBINE_RATE_LIMIT", "5"))  # combined events per window per camera/zone
+COMBINE_RATE_WINDOW_SECONDS = float(os.getenv("COMBINE_RATE_WINDOW_SECONDS", "60"))
+RATE_LIMIT_IDLE_SECONDS = float(os.getenv("RATE_LIMIT_IDLE_SECONDS", "600"))
+# Per-zone overrides, e.g. ZONE_RATE_LIMITS='{"ZoneA": 20}'
+ZONE_RATE_LIMITS: Dict[str, int] = json.loads(os.getenv("ZONE_RATE_LIMITS", "{}"))
+for _zone, _limit in ZONE_RATE_LIMITS.items():
+    if not isinstance(_limit, int) or _limit < 0:
+        raise ValueError(f"Rate limit for zone '{_zone}' must be a non-negative integer, got {_limit!r}")
+
+# ---------------- Delivery Config ----------------
+DISPATCH_URL = os.getenv("DISPATCH_URL", "http://localhost:8004/dispatch-event/")
+SUMMARY_URL = os.getenv("SUMMARY_URL", "http://localhost:8005/generate-summary")
+SUMMARY_BATCH_URL = os.getenv("SUMMARY_BATCH_URL") or None  # send summary batches as one JSON list when set
+# Above the summary agent's worst case: a 20 s batch LLM call, then 20 s per-event fallbacks
+SUMMARY_TIMEOUT_SECONDS = float(os.getenv("SUMMARY_TIMEOUT_SECONDS", "60"))
+DELIVERY_BATCH_SIZE = int(os.getenv("DELIVERY_BATCH_SIZE", "50"))
+DELIVERY_LINGER_MS = float(os.getenv("DELIVERY_LINGER_MS", "50"))
+DELIVERY_MAX_QUEUE = int(os.getenv("DELIVERY_MAX_QUEUE", "10000"))  # per destination, before spilling to disk
+DELIVERY_MAX_ATTEMPTS = int(os.getenv("DELIVERY_MAX_ATTEMPTS", "5"))
+DELIVERY_SPILL_PATH = Path(os.getenv("DELIVERY_SPILL_PATH", "delivery_spill.jsonl"))
+DELIVERY_SPILL_MAX_MB = int(os.getenv("DELIVERY_SPILL_MAX_MB", "64"))
+THREAT_LEVELS = {"high": "critical", "medium": "elevated", "low": "low"}
 
 # ---------------- In-Memory Store ----------------
-temp_store: Dict[Tuple[str, str], Dict[str, dict]] = {}
-combine_rate: Dict[Tuple[str, str], List[datetime]] = {}
+correlation_store = CorrelationStore(
+    tolerance=CORRELATION_TOLERANCE_SECONDS,
+    ttl=CORRELATION_TTL_SECONDS,
+    max_entries=CORRELATION_MAX_ENTRIES,
+    shards=CORRELATION_SHARDS
+)
+combine_limiter = RateLimiter(
+    RATE_LIMIT_ALGORITHM,
+    limit=COMBINE_RATE_LIMIT,
+    window=COMBINE_RATE_WINDOW_SECONDS,
+    zone_limits=ZONE_RATE_LIMITS,
+    max_idle=RATE_LIMIT_IDLE_SECONDS
+)
+
+def to_summary_event(event: dict) -> dict:
+    """Combined event -> the summary agent's CombinedEvent schema."""
+    return {
+        "eventId": event["event_id"],
+        "type": event["dispatch_type"],
+        "severity": event["severity"],
+        "location": event["location"],
+        "timestamp": event["timestamp"],
+        "details": event["message"],
+        "threat_level": THREAT_LEVELS.get(event["severity"], event["severity"]),
+        "threat_type": ", ".join(t["label"] for t in event["threats"]) or "none",
+    }
+
+delivery = DeliveryManager(
+    [
+        Destination("dispatch", DISPATCH_URL),
+        Destination("summary", SUMMARY_URL, batch_url=SUMMARY_BATCH_URL, transform=to_summary_event,
+                    timeout=SUMMARY_TIMEOUT_SECONDS),
+    ],
+    batch_size=DELIVERY_BATCH_SIZE,
+    linger_ms=DELIVERY_LINGER_MS,
+    max_queue=DELIVERY_MAX_QUEUE,
+    max_attempts=DELIVERY_MAX_ATTEMPTS,
+    spill_path=DELIVERY_SPILL_PATH,
+    spill_max_bytes=DELIVERY_SPILL_MAX_MB * 1024 * 1024
+)
+
+# ---------------- FastAPI Init ----------------
+async def sweep_expired():
+    # Idle shards only expire here; busy ones also expire on every add
+    while True:
+        await asyncio.sleep(EXPIRY_SWEEP_SECONDS)
+        expired = correlation_store.expire()
+        if expired:
+            logger.info(f"Expired {expired} unmatched readings")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    sweeper = asyncio.create_task(sweep_expired())
+    await delivery.start()
+    try:
+        yield
+    finally:
+        sweeper.cancel()
+        await asyncio.gather(sweeper, return_exceptions=True)
+        await delivery.stop()  # undelivered events are kept in the spill log
+
+app = FastAPI(title="Central Combiner Service", lifespan=lifespan)
 
 # ---------------- Schemas ----------------
+class Threat(BaseModel):
+    label: str
+    confidence: float
+
 class AnomalyInput(BaseModel):
     camera_id: str
     location: str
     zone_id: str
-    threats: List[Dict[str, float]]  # [{ "label": "fire", "confidence": 0.9 }]
+    threats: List[Threat]  # [{ "label": "fire", "confidence": 0.9 }]
     model_version: str
+    timestamp: Optional[str] = None  # ISO 8601 capture time; arrival time when omitted
 
 class BottleneckInput(BaseModel):
     camera_id: str
@@ -50,78 +158,163 @@ def map_severity(threats: List[Dict]) -> str:
             return "medium"
     return "low"
 
+def reading_time(value: Optional[str]) -> float:
+    """Epoch seconds of an ISO 8601 timestamp (naive means UTC); arrival time if missing or malformed."""
+    if value:
+        try:
+            parsed = datetime.fromisoformat(value)
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.timestamp()
+        except ValueError:
+            logger.warning(f"Unparseable timestamp '{value}', using arrival time")
+    return time.time()
+
 def log_metrics(event: dict):
     logger.info(f"[METRICS] Combined Event Logged: {event['event_id']} | Dispatch: {event['dispatch_type']} | Severity: {event['severity']}")
 
 def is_rate_limited(key: Tuple[str, str]) -> bool:
-    now = datetime.utcnow()
-    window = combine_rate.setdefault(key, [])
-    combine_rate[key] = [t for t in window if now - t < timedelta(minutes=1)]
-    if len(combine_rate[key]) >= 5:
-        return True
-    combine_rate[key].append(now)
-    return False
-
-def try_combine(key: Tuple[str, str]) -> Optional[dict]:
-    if is_rate_limited(key):
-        logger.warning(f"[{key}] Rate limited for combining events")
-        return None
+    return not combine_limiter.allow(key, zone=key[1])
 
-    data = temp_store.get(key)
-    if data and "anomaly" in data and "bottleneck" in data:
-        anomaly = data["anomaly"]
-        bottleneck = data["bottleneck"]
+def combine(key: Tuple[str, str], anomaly: dict, bottleneck: dict) -> dict:
+    logger.info(f"[{key}] Combining data from anomaly and bottleneck agents")
 
-        logger.info(f"[{key}] Combining data from anomaly and bottleneck agents")
+    threats = anomaly["threats"]
+    dispatch_type = map_dispatch_type(threats, bottleneck["crowd_density"])
+    severity = map_severity(threats)
 
-        threats = anomaly["threats"]
-        dispatch_type = map_dispatch_type(threats, bottleneck["crowd_density"])
-        severity = map_severity(threats)
+    combined_event = {
+        "event_id": generate_event_id(),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "camera_id": anomaly["camera_id"],
+        "location": anomaly["location"],
+        "zone_id": anomaly["zone_id"],
+        "model_version": anomaly["model_version"],
+        "dispatch_type": dispatch_type,
+        "severity": severity,
+        "crowd_density": bottleneck["crowd_density"],
+        "threats": threats,
+        "message": f"Threats: {', '.join(t['label'] for t in threats)} | Crowd: {bottleneck['crowd_density']}",
+        "safe": False,
+        "source": ["anomaly-agent", "bottleneck-agent"]
+    }
 
-        combined_event = {
-            "event_id": generate_event_id(),
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "camera_id": anomaly["camera_id"],
-            "location": anomaly["location"],
-            "zone_id": anomaly["zone_id"],
-            "model_version": anomaly["model_version"],
-            "dispatch_type": dispatch_type,
-            "severity": severity,
-            "crowd_density": bottleneck["crowd_density"],
-            "threats": threats,
-            "message": f"Threats: {', '.join(t['label'] for t in threats)} | Crowd: {bottleneck['crowd_density']}",
-            "safe": False,
-            "source": ["anomaly-agent", "bottleneck-agent"]
-        }
+    log_metrics(combined_event)
+    delivery.submit(combined_event)
 
-        del temp_store[key]
-        log_metrics(combined_event)
+    return combined_event
 
-        # TO DO: Save to database or forward to Dispatch/Summary
+def correlate(kind: str, key: Tuple[str, str], timestamp: float, payload: dict) -> Optional[dict]:
+    """Store the reading; if a partner within tolerance is waiting, consume it and return the combined event."""
+    pair = correlation_store.add(kind, key, timestamp, payload)
+    if pair is None:
+        return None
+    # Tokens are charged per combined event; unmatched readings never spend one
+    if is_rate_limited(key):
+        logger.warning(f"[{key}] Rate limited for combining events, dropping the pair")
+        return None
+    anomaly, bottleneck = pair
+    return combine(key, anomaly, bottleneck)
+
+# ---------------- Stream Ingest ----------------
+READING_SCHEMAS = {"anomaly": AnomalyInput, "bottleneck": BottleneckInput}
 
-        return combined_event
+def ingest_reading(obj: dict, kind: Optional[str] = None) -> Optional[dict]:
+    """Validate one reading and correlate it; returns the combined event if it completed a pair.
 
-    return None
+    `kind` comes from the endpoint, or from the reading's own "kind" field on mixed streams.
+    Raises ValueError / ValidationError for malformed readings.
+    """
+    if not isinstance(obj, dict):
+        raise ValueError("reading must be a JSON object")
+    kind = kind or obj.get("kind")
+    if kind not in READING_SCHEMAS:
+        raise ValueError(f"'kind' must be one of {list(READING_SCHEMAS)}")
+    data = READING_SCHEMAS[kind](**obj)
+    key = (data.camera_id, data.zone_id)
+    timestamp = data.timestamp if kind == "anomaly" else data.analyzed_at
+    return correlate(kind, key, reading_time(timestamp), data.dict())
+
+def ingest_line(line: bytes, line_no: int, kind: Optional[str]) -> Optional[dict]:
+    """Stream record for one NDJSON line: a combined event, an error, or None."""
+    try:
+        combined = ingest_reading(json.loads(line), kind)
+    except (ValueError, ValidationError) as e:  # JSONDecodeError is a ValueError
+        return {"type": "error", "line": line_no, "detail": str(e)}
+    if combined is None:
+        return None
+    return {"type": "combined", "event": combined}
+
+def ingest_ndjson(body: bytes, kind: Optional[str] = None):
+    """Correlate an NDJSON batch line by line, yielding NDJSON records as pairs complete."""
+    received = 0
+    for line_no, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        received += 1
+        record = ingest_line(line, line_no, kind)
+        if record is not None:
+            yield json.dumps(record) + "\n"
+    logger.info(f"Bulk ingest finished: {received} readings")
+    yield json.dumps({"type": "done", "readings": received}) + "\n"
 
 # ---------------- Routes ----------------
 @app.post("/from-anomaly")
 def receive_anomaly(data: AnomalyInput):
     key = (data.camera_id, data.zone_id)
-    temp_store.setdefault(key, {})["anomaly"] = data.dict()
     logger.info(f"[{key}] Received anomaly input")
 
-    combined = try_combine(key)
+    combined = correlate("anomaly", key, reading_time(data.timestamp), data.dict())
     if combined:
         return {"status": "combined", "event": combined}
-    return {"status": "anomaly received – waiting for bottleneck or rate-limited"}
+    return {"status": "anomaly received – waiting for bottleneck, or pair rate-limited"}
 
 @app.post("/from-bottleneck")
 def receive_bottleneck(data: BottleneckInput):
     key = (data.camera_id, data.zone_id)
-    temp_store.setdefault(key, {})["bottleneck"] = data.dict()
     logger.info(f"[{key}] Received bottleneck input")
 
-    combined = try_combine(key)
+    combined = correlate("bottleneck", key, reading_time(data.analyzed_at), data.dict())
     if combined:
         return {"status": "combined", "event": combined}
-    return {"status": "bottleneck received – waiting for anomaly or rate-limited"}
+    return {"status": "bottleneck received – waiting for anomaly, or pair rate-limited"}
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "correlation_store": correlation_store.stats(),
+        "rate_limiter": combine_limiter.stats(),
+        "delivery": delivery.snapshot()
+    }
+
+# The body is read before the response starts: StreamingResponse also consumes receive() to watch for disconnects
+@app.post("/ingest")
+async def ingest_mixed(request: Request):
+    """NDJSON body of readings, each tagged with "kind": "anomaly" | "bottleneck"."""
+    return StreamingResponse(ingest_ndjson(await request.body()), media_type="application/x-ndjson")
+
+@app.post("/from-anomaly/bulk")
+async def receive_anomaly_bulk(request: Request):
+    return StreamingResponse(ingest_ndjson(await request.body(), "anomaly"), media_type="application/x-ndjson")
+
+@app.post("/from-bottleneck/bulk")
+async def receive_bottleneck_bulk(request: Request):
+    return StreamingResponse(ingest_ndjson(await request.body(), "bottleneck"), media_type="application/x-ndjson")
+
+@app.websocket("/ws/ingest")
+async def ingest_websocket(websocket: WebSocket):
+    """Each text message is one tagged reading (or several as NDJSON); combined events are pushed back as they form."""
+    await websocket.accept()
+    line_no = 0
+    try:
+        while True:
+            message = await websocket.receive_text()
+            for line in message.splitlines():
+                line_no += 1
+                if not line.strip():
+                    continue
+                record = ingest_line(line.encode(), line_no, None)
+                if record is not None:
+                    await websocket.send_text(json.dumps(record))
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket ingest closed after {line_no} messages")
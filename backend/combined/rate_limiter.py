@@ -0,0 +1,124 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+# ----------- Per-Key State -----------
+class TokenBucket:
+    """Refills `limit` tokens per `window` seconds, holding at most `limit`; one token per event."""
+
+    __slots__ = ("tokens", "updated", "touched")
+
+    def __init__(self, limit: int, now: float):
+        self.tokens = float(limit)
+        self.updated = now
+        self.touched = now
+
+    def allow(self, limit: int, window: float, now: float) -> bool:
+        self.tokens = min(float(limit), self.tokens + (now - self.updated) * limit / window)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+class SlidingWindowCounter:
+    """Approximate sliding window: the previous fixed window's count weighted by its remaining overlap."""
+
+    __slots__ = ("window_index", "current", "previous", "touched")
+
+    def __init__(self, limit: int, now: float):
+        self.window_index = -1
+        self.current = 0
+        self.previous = 0
+        self.touched = now
+
+    def allow(self, limit: int, window: float, now: float) -> bool:
+        index = math.floor(now / window)
+        if index != self.window_index:
+            self.previous = self.current if index == self.window_index + 1 else 0
+            self.current = 0
+            self.window_index = index
+        elapsed_fraction = now / window - index
+        if self.previous * (1.0 - elapsed_fraction) + self.current >= limit:
+            return False
+        self.current += 1
+        return True
+
+ALGORITHMS = {"token_bucket": TokenBucket, "sliding_window": SlidingWindowCounter}
+
+# ----------- Rate Limiter -----------
+class RateLimiter:
+    """Per-key rate limiter with O(1) checks and bounded memory.
+
+    Each key allows `limit` events per `window` seconds, or `zone_limits[zone]` when its
+    zone has an override. Keys unused for `max_idle` seconds are evicted; `max_idle` is
+    raised to at least two windows, since a sliding-window key still counts its previous
+    window's events until then and evicting it earlier would reset its allowance. At most
+    `max_keys` are tracked (least recently used evicted first). Safe to call from
+    FastAPI's threadpool.
+    """
+
+    def __init__(self, algorithm: str = "sliding_window", *, limit: int, window: float,
+                 zone_limits: Optional[dict] = None, max_idle: float = 600.0, max_keys: int = 1_000_000):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown rate limit algorithm '{algorithm}', expected one of {', '.join(ALGORITHMS)}")
+        self.algorithm = algorithm
+        self._state_cls = ALGORITHMS[algorithm]
+        self.limit = limit
+        self.window = window
+        self.zone_limits = dict(zone_limits or {})
+        self.max_idle = max(max_idle, 2 * window)
+        self.max_keys = max_keys
+        self._states = OrderedDict()  # key -> state, least recently used first
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+        self.allowed = 0
+        self.limited = 0
+        self.evicted = 0
+
+    def allow(self, key: Hashable, zone: Optional[str] = None, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        limit = self.zone_limits.get(zone, self.limit)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = self._state_cls(limit, now)
+            else:
+                self._states.move_to_end(key)
+            state.touched = now
+            allowed = state.allow(limit, self.window, now)
+            if allowed:
+                self.allowed += 1
+            else:
+                self.limited += 1
+            if len(self._states) > self.max_keys:
+                self._states.popitem(last=False)
+                self.evicted += 1
+            if now >= self._next_sweep:
+                self._evict_idle(now)
+        return allowed
+
+    def _evict_idle(self, now: float):
+        # Least recently touched keys sit at the front, so the sweep stops at the first live one
+        states = self._states
+        while states:
+            key, state = next(iter(states.items()))
+            if now - state.touched < self.max_idle:
+                break
+            del states[key]
+            self.evicted += 1
+        self._next_sweep = now + min(1.0, self.max_idle)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def stats(self) -> dict:
+        return {
+            "algorithm": self.algorithm,
+            "keys": len(self._states),
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1 @@
+"""Helpers shared by the backend services (each service puts backend/ on sys.path to import them)."""
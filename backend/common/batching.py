@@ -0,0 +1,22 @@
+import asyncio
+import time
+
+# ----------- Linger Collection -----------
+async def collect_batch(queue: asyncio.Queue, max_size: int, linger: float, batch=None) -> list:
+    """Wait for one item, then keep taking items until `max_size` are held or `linger` seconds have passed.
+
+    Items are appended to `batch` (a new list by default) as they are taken, so a caller
+    cancelled mid-collection can still find and hand off what was already dequeued.
+    """
+    batch = [] if batch is None else batch
+    batch.append(await queue.get())
+    deadline = time.monotonic() + linger
+    while len(batch) < max_size:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout))
+        except asyncio.TimeoutError:
+            break
+    return batch
@@ -0,0 +1,8 @@
+from sqlalchemy import create_engine
+
+# ----------- Engine -----------
+def create_db_engine(url: str, *, pool_size: int, max_overflow: int):
+    """Pooled engine with pre-ping for PostgreSQL; SQLite (the local stand-in) keeps its default pool."""
+    if url.startswith("sqlite"):
+        return create_engine(url)
+    return create_engine(url, pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True)
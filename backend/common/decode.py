@@ -0,0 +1,58 @@
+import struct
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# JPEG start-of-frame markers carry the image size (C4, C8 and CC are not SOF markers)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# ----------- Header Probe -----------
+def probe_size(buf: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from a JPEG or PNG header without decoding pixels; None if unknown."""
+    if buf[:8] == b"\x89PNG\r\n\x1a\n" and len(buf) >= 24:
+        width, height = struct.unpack(">II", buf[16:24])
+        return width, height
+
+    if buf[:2] != b"\xff\xd8":
+        return None
+    pos = 2
+    while pos + 4 <= len(buf):
+        if buf[pos] != 0xFF:
+            return None
+        marker = buf[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker in (0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7):  # standalone markers
+            pos += 2
+            continue
+        (length,) = struct.unpack(">H", buf[pos + 2:pos + 4])
+        if marker in _JPEG_SOF_MARKERS:
+            if pos + 9 > len(buf):
+                return None
+            height, width = struct.unpack(">HH", buf[pos + 5:pos + 9])
+            return width, height
+        pos += 2 + length
+    return None
+
+# ----------- Decode -----------
+def reduced_decode(img_bytes: bytes, needed: int, side=max) -> np.ndarray:
+    """Decode at 1/4 or 1/2 scale when `side(width, height)` keeps at least `needed` pixels after it.
+
+    The reduction is done inside libjpeg's IDCT for JPEGs, so it is much cheaper than
+    a full decode followed by a resize. Unknown headers decode at full size.
+    """
+    flag = cv2.IMREAD_COLOR
+    size = probe_size(img_bytes)
+    if size is not None:
+        measured = side(size)
+        if measured >= 4 * needed:
+            flag = cv2.IMREAD_REDUCED_COLOR_4
+        elif measured >= 2 * needed:
+            flag = cv2.IMREAD_REDUCED_COLOR_2
+    return cv2.imdecode(np.frombuffer(img_bytes, np.uint8), flag)
+
+def decode_for_model(img_bytes: bytes, model_input_size: int) -> np.ndarray:
+    """Reduced decode for a model that letterboxes its longest side down to `model_input_size`."""
+    return reduced_decode(img_bytes, model_input_size, side=max)
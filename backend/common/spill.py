@@ -0,0 +1,61 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+# ----------- Spill File -----------
+class SpillFile:
+    """Append-only JSONL overflow file, capped at `max_bytes`.
+
+    Appends are fsynced before they count as written. `take()` moves the file aside for
+    replay and `done()` deletes it once the caller has stored or re-queued the records,
+    so a crash in between replays them again: delivery is at-least-once. Every method
+    blocks on disk I/O, so async callers go through an executor or asyncio.to_thread;
+    a lock keeps appends and takes atomic with respect to each other.
+    """
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = Path(path)
+        self.replay_path = self.path.with_suffix(self.path.suffix + ".replay")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def append(self, records) -> int:
+        """Append records in order until the cap is reached; returns how many were written."""
+        lines = [json.dumps(record) + "\n" for record in records]
+        with self._lock:
+            room = self.max_bytes - self.size
+            kept = 0
+            for line in lines:
+                if len(line) > room:
+                    break
+                room -= len(line)
+                kept += 1
+            if kept:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.writelines(lines[:kept])
+                    f.flush()
+                    os.fsync(f.fileno())
+        return kept
+
+    def take(self):
+        """Return the records to replay: those of an unfinished earlier take, else the current file's."""
+        with self._lock:
+            if not self.replay_path.exists():
+                if not self.size:
+                    return []
+                os.replace(self.path, self.replay_path)
+        with open(self.replay_path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def done(self):
+        """Discard the records returned by `take()`; call once they are stored or appended back."""
+        with self._lock:
+            self.replay_path.unlink(missing_ok=True)
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from common.batching import collect_batch
+from common.spill import SpillFile
+
+logger = logging.getLogger("write-behind")
+
+# ----------- Write-Behind Buffer -----------
+class BufferFull(Exception):
+    """Raised when the write-behind buffer cannot take another item and there is no spill file."""
+
+class WriteBehindBuffer:
+    """Buffers rows in memory and writes them in bulk off the event loop.
+
+    `write(batch)` runs on `executor` and raises if the batch was not stored. A flush
+    happens once `max_batch` items are buffered or `flush_interval_ms` has passed since
+    the first arrived; `stop()` flushes what is left. At most `max_buffer` items wait.
+    Without a `spill` file, a full buffer raises BufferFull and a failed batch is lost
+    (counted in rows_failed). With one, both go to the file (items must be JSON), and
+    every `replay_interval` seconds the file is replayed through `write`; a crash during
+    a replay repeats it on restart, so `write` should tolerate rows it has already stored.
+    A batch failing with one of `row_errors` (errors caused by a row, not the store) is
+    bisected until the offending rows are found; those go to `dead_letter` (or are
+    counted in rows_rejected) and the rest are written. `executor` should have a single
+    worker so flushes and replays never overlap.
+    """
+
+    def __init__(self, write, *, executor, name: str = "rows", max_batch: int = 200, flush_interval_ms: float = 200,
+                 max_buffer: int = 10000, spill: Optional[SpillFile] = None, replay_interval: float = 10.0,
+                 row_errors: tuple = (), dead_letter: Optional[SpillFile] = None):
+        self.write = write
+        self.executor = executor
+        self.name = name
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_buffer = max_buffer
+        self.spill = spill
+        self.replay_interval = replay_interval
+        self.row_errors = row_errors
+        self.dead_letter = dead_letter
+        self.flushes = 0
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.rows_spilled = 0
+        self.rows_replayed = 0
+        self.rows_dropped = 0
+        self.rows_rejected = 0
+        self.last_flush_ms = 0.0
+        self.flush_ms_total = 0.0
+        self._started_at = None
+        self._queue = None
+        self._tasks = []
+        self._flushing = None
+        self._collecting = []  # taken off the queue, waiting for the batch to fill
+
+    @property
+    def buffered(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        self._started_at = time.monotonic()
+        self._queue = asyncio.Queue(maxsize=self.max_buffer)
+        self._tasks = [asyncio.create_task(self._run())]
+        if self.spill is not None:
+            self._tasks.append(asyncio.create_task(self._replay_loop()))
+
+    async def stop(self):
+        if not self._tasks:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._flushing is not None:
+            await asyncio.gather(self._flushing, return_exceptions=True)
+        leftover, self._collecting = self._collecting, []
+        await self._flush(leftover)
+        while self.buffered:
+            await self._flush(self._drain(self.max_batch))
+        logger.info(f"Writer stopped after writing {self.rows_written} {self.name}")
+
+    def submit(self, item):
+        """Never blocks the request: a full buffer spills the item, or raises BufferFull without a spill file."""
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            if self.spill is None:
+                raise BufferFull(f"write buffer full ({self.max_buffer} {self.name})")
+            asyncio.get_running_loop().run_in_executor(self.executor, self._spill, [item])
+
+    def _drain(self, limit: int):
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            await collect_batch(self._queue, self.max_batch, self.flush_interval, self._collecting)
+            batch, self._collecting = self._collecting, []
+            # A flush that has started runs to completion even if stop() cancels this loop
+            self._flushing = asyncio.ensure_future(self._flush(batch))
+            await asyncio.shield(self._flushing)
+
+    async def _flush(self, batch):
+        if batch:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self._write_or_spill, batch)
+
+    # Everything below runs on the executor thread
+    def _write_or_spill(self, batch, replaying: bool = False) -> bool:
+        """Write `batch`, setting aside rejected rows; False if the store failed and the unwritten rest was spilled."""
+        start = time.perf_counter()
+        pending = [batch]  # slices still to write, in order
+        written = 0
+        while pending:
+            part = pending.pop(0)
+            try:
+                self.write(part)
+            except self.row_errors as e:
+                if len(part) > 1:
+                    # One bad row fails the whole statement; halve the slice until it is alone
+                    middle = len(part) // 2
+                    pending[:0] = [part[:middle], part[middle:]]
+                else:
+                    self._reject(part[0], e)
+                continue
+            except Exception as e:
+                rest = [item for unwritten in [part, *pending] for item in unwritten]
+                reason = str(e).splitlines()[0]
+                if self.spill is None:
+                    self.rows_failed += len(rest)
+                    logger.error(f"Failed to write {len(rest)} {self.name}: {reason}")
+                else:
+                    logger.error(f"Failed to write {len(rest)} {self.name}, spilling to {self.spill.path}: {reason}")
+                    self._spill(rest, replaying)
+                self.rows_written += written
+                return False
+            written += len(part)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.flushes += 1
+        self.rows_written += written
+        self.last_flush_ms = elapsed_ms
+        self.flush_ms_total += elapsed_ms
+        return True
+
+    def _spill(self, items, replaying: bool = False):
+        kept = self.spill.append(items)
+        if not replaying:
+            self.rows_spilled += kept
+        if kept < len(items):
+            self.rows_dropped += len(items) - kept
+            logger.error(f"Spill file full, dropped {len(items) - kept} {self.name}")
+
+    def _reject(self, item, error: Exception):
+        self.rows_rejected += 1
+        reason = str(error).splitlines()[0]
+        if self.dead_letter is None:
+            logger.error(f"Discarding one of the {self.name}, the store rejected it: {reason}")
+            return
+        logger.error(f"Moving one of the {self.name} to {self.dead_letter.path}, the store rejected it: {reason}")
+        if not self.dead_letter.append([{"item": item, "error": reason}]):
+            self.rows_dropped += 1
+            logger.error(f"Dead-letter file full, dropped one of the {self.name}")
+
+    def _replay(self):
+        records = self.spill.take()
+        if not records:
+            return
+        logger.info(f"Replaying {len(records)} spilled {self.name}")
+        for i in range(0, len(records), self.max_batch):
+            chunk = records[i:i + self.max_batch]
+            if not self._write_or_spill(chunk, replaying=True):
+                self._spill(records[i + self.max_batch:], replaying=True)  # database still down; keep the rest
+                break
+            self.rows_replayed += len(chunk)
+        self.spill.done()
+
+    async def _replay_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.replay_interval)
+            try:
+                await loop.run_in_executor(self.executor, self._replay)
+            except Exception as e:
+                logger.error(f"Spill replay failed: {e}")
+
+    def stats(self) -> dict:
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        stats = {
+            "buffered": self.buffered + len(self._collecting),
+            "max_buffer": self.max_buffer,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "rows_per_second": round(self.rows_written / uptime, 1) if uptime else 0.0,
+            "avg_batch": round(self.rows_written / self.flushes, 1) if self.flushes else 0.0,
+            "avg_flush_ms": round(self.flush_ms_total / self.flushes, 2) if self.flushes else 0.0,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "rows_rejected": self.rows_rejected,
+        }
+        if self.dead_letter is not None:
+            stats["dead_letter_bytes"] = self.dead_letter.size
+        if self.spill is None:
+            stats["rows_failed"] = self.rows_failed
+        else:
+            stats.update({
+                "rows_spilled": self.rows_spilled,
+                "rows_replayed": self.rows_replayed,
+                "rows_dropped": self.rows_dropped,
+                "spill_bytes": self.spill.size,
+            })
+        return stats
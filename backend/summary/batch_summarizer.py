@@ -0,0 +1,166 @@
+import asyncio
+import json
+import logging
+import re
+import sys
+from pathlib import Path
+
+from llm_client import LLMUnavailable
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # backend/, home of the shared `common` package
+from common.batching import collect_batch
+
+logger = logging.getLogger("summary-agent.batch")
+
+BATCH_PROMPT_HEADER = "Generate concise summaries of the following safety incidents."
+INCIDENTS_MARKER = "INCIDENTS_JSON:"
+
+# ----------- Prompt / Parsing -----------
+def build_batch_prompt(incidents) -> str:
+    """One prompt for several incidents; the reply must be JSON keyed by each incident's id."""
+    return (
+        f"{BATCH_PROMPT_HEADER}\n"
+        f"Summarize each incident in 2-3 sentences suitable for emergency response logs.\n"
+        f"Respond with only a JSON object of the form "
+        f'{{"summaries": [{{"id": "<incident id>", "summary": "<text>"}}]}} '
+        f"containing exactly one entry per incident id.\n"
+        f"{INCIDENTS_MARKER}\n{json.dumps(incidents, ensure_ascii=False)}"
+    )
+
+def parse_batch_reply(text: str, ids) -> dict:
+    """{id: summary} for every well-formed entry whose id was asked for; anything else is dropped."""
+    body = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip())
+    try:
+        reply = json.loads(body)
+    except json.JSONDecodeError:
+        return {}
+    entries = reply.get("summaries") if isinstance(reply, dict) else None
+    if not isinstance(entries, list):
+        return {}
+    wanted = set(ids)
+    summaries = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        incident_id, summary = str(entry.get("id")), entry.get("summary")
+        if incident_id in wanted and isinstance(summary, str) and summary.strip():
+            summaries[incident_id] = summary.strip()
+    return summaries
+
+def fake_responder(prompt: str) -> str:
+    """FakeModel reply that understands batch prompts, so LLM_BACKEND=fake exercises the batch path too."""
+    if INCIDENTS_MARKER in prompt:
+        incidents = json.loads(prompt.split(INCIDENTS_MARKER, 1)[1])
+        return json.dumps({"summaries": [
+            {"id": i["id"], "summary": f"[fake summary] {i['severity']} {i['type']} at {i['location']}"}
+            for i in incidents
+        ]})
+    first_line = prompt.strip().splitlines()[0] if prompt.strip() else ""
+    return f"[fake summary] {first_line[:160]}"
+
+# ----------- Batching Summarizer -----------
+class BatchSummarizer:
+    """Packs concurrent summary requests into one LLM call per batch.
+
+    Events are collected for up to `linger_ms` (or until `max_batch` are waiting) and
+    summarised with a single structured prompt. Events the reply does not cover with a
+    valid summary, and every event of a batch whose call failed, are retried one by one
+    through `summarize_one(event) -> (text, source)`, which owns the fallback template.
+    A batch of one goes straight to `summarize_one`.
+    """
+
+    def __init__(self, llm_client, summarize_one, incident, *, max_batch: int = 8, linger_ms: float = 50):
+        self.llm_client = llm_client
+        self.summarize_one = summarize_one
+        self.incident = incident
+        self.max_batch = max_batch
+        self.linger = linger_ms / 1000
+        self.batch_calls = 0
+        self.single_calls = 0
+        self.events = 0
+        self.parse_failures = 0
+        self._queue = None
+        self._worker = None
+        self._in_flight = set()
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, *self._in_flight, return_exceptions=True)
+            self._worker = None
+
+    async def submit(self, event):
+        if self.max_batch <= 1:
+            self.events += 1
+            self.single_calls += 1
+            return await self.summarize_one(event)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((event, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = await collect_batch(self._queue, self.max_batch, self.linger)
+            # Batches run concurrently; the LLM client's semaphore bounds the calls
+            task = asyncio.create_task(self._summarize(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _summarize(self, batch):
+        self.events += len(batch)
+        try:
+            results = await self._summarize_events([event for event, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _summarize_events(self, events):
+        if len(events) == 1:
+            self.single_calls += 1
+            return [await self.summarize_one(events[0])]
+
+        ids = [str(i) for i in range(len(events))]
+        incidents = [{"id": incident_id, **self.incident(event)} for incident_id, event in zip(ids, events)]
+        self.batch_calls += 1
+        try:
+            reply = await self.llm_client.generate(build_batch_prompt(incidents))
+            summaries = parse_batch_reply(reply, ids)
+        except LLMUnavailable as e:
+            logger.warning(f"Batch of {len(events)} failed ({e}), summarising individually")
+            summaries = {}
+        if len(summaries) < len(events):
+            self.parse_failures += 1
+
+        results = [None] * len(events)
+        retry = []
+        for i, incident_id in enumerate(ids):
+            if incident_id in summaries:
+                results[i] = (summaries[incident_id], self.llm_client.model.model_name)
+            else:
+                retry.append(i)
+        if retry:
+            self.single_calls += len(retry)
+            singles = await asyncio.gather(*(self.summarize_one(events[i]) for i in retry))
+            for i, result in zip(retry, singles):
+                results[i] = result
+        return results
+
+    def stats(self) -> dict:
+        calls = self.batch_calls + self.single_calls
+        return {
+            "events": self.events,
+            "batch_calls": self.batch_calls,
+            "single_calls": self.single_calls,
+            "calls_per_event": round(calls / self.events, 3) if self.events else 0.0,
+            "incomplete_batch_replies": self.parse_failures,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+        }
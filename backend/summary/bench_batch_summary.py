@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import random
+import time
+
+from batch_summarizer import BatchSummarizer, INCIDENTS_MARKER, fake_responder
+from llm_client import FakeModel, LLMClient
+
+# ----------- Synthetic Model / Events -----------
+class ScalingFakeModel(FakeModel):
+    """Fake model whose latency grows with the number of incidents in the prompt, like output tokens do."""
+
+    def __init__(self, base_latency: float, per_incident: float):
+        super().__init__(latency=base_latency, responder=fake_responder)
+        self.base_latency = base_latency
+        self.per_incident = per_incident
+
+    async def generate(self, prompt: str) -> str:
+        incidents = prompt.split(INCIDENTS_MARKER, 1)[1].count('"id"') if INCIDENTS_MARKER in prompt else 1
+        self.latency = self.base_latency + self.per_incident * incidents
+        return await super().generate(prompt)
+
+def synthetic_event(i: int) -> dict:
+    return {
+        "type": "fire", "severity": "high", "threat_type": "smoke", "threat_level": "critical",
+        "location": f"Gate {i}", "timestamp": "2026-01-01T00:00:00Z", "details": "Crowd surge near exit",
+    }
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+# ----------- Burst -----------
+async def run_burst(batch_size: int, events: int, burst_seconds: float, concurrency: int, base: float, per: float):
+    model = ScalingFakeModel(base, per)
+    client = LLMClient(model, max_concurrency=concurrency, deadline=600)
+
+    async def summarize_one(event):
+        return await client.generate(f"Generate a concise summary of a safety incident at {event['location']}"), "fake"
+
+    summarizer = BatchSummarizer(client, summarize_one, lambda event: event, max_batch=batch_size, linger_ms=50)
+    await summarizer.start()
+    rng = random.Random(0)
+    latencies = []
+
+    async def one(i: int):
+        await asyncio.sleep(rng.uniform(0, burst_seconds))
+        start = time.perf_counter()
+        await summarizer.submit(synthetic_event(i))
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(events)))
+    elapsed = time.perf_counter() - start
+    await summarizer.stop()
+    return model.calls / events, _percentile(latencies, 50), _percentile(latencies, 95), elapsed
+
+# ----------- Main -----------
+async def main():
+    parser = argparse.ArgumentParser(description="LLM calls per event and latency for bursts of summary requests.")
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--burst-seconds", type=float, default=1.0, help="events arrive uniformly over this span")
+    parser.add_argument("--concurrency", type=int, default=8, help="LLM calls allowed in flight")
+    parser.add_argument("--base-latency", type=float, default=0.8, help="seconds per LLM call")
+    parser.add_argument("--per-incident", type=float, default=0.15, help="extra seconds per incident in a prompt")
+    parser.add_argument("--batch-size", type=int, action="append", help="max incidents per call (repeatable; default 1, 8, 16)")
+    args = parser.parse_args()
+
+    print(f"{'batch':>6} {'calls/event':>12} {'p50 s':>7} {'p95 s':>7} {'wall s':>7}")
+    for batch_size in args.batch_size or [1, 8, 16]:
+        calls, p50, p95, wall = await run_burst(batch_size, args.events, args.burst_seconds, args.concurrency,
+                                                args.base_latency, args.per_incident)
+        print(f"{batch_size:>6} {calls:>12.3f} {p50:>7.2f} {p95:>7.2f} {wall:>7.2f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger("summary-agent.llm")
+
+# ----------- Errors -----------
+class LLMUnavailable(Exception):
+    """No text could be produced within the attempts and deadline allowed."""
+
+class CircuitOpen(LLMUnavailable):
+    """The breaker is open: recent calls failed, so this one was not attempted."""
+
+# ----------- Models -----------
+class GeminiModel:
+    """google-generativeai model called through its native async API."""
+
+    name = "gemini"
+
+    def __init__(self, model_name: str, api_key: str):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text.strip()
+
+class FakeModel:
+    """Local stand-in with configurable latency and failure rate, for tests and load runs.
+
+    `responder(prompt) -> str` produces the reply; by default it echoes the prompt's first line.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency: float = 0.2, failure_rate: float = 0.0, seed: Optional[int] = None,
+                 responder: Optional[Callable[[str], str]] = None):
+        self.model_name = "fake-model"
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.responder = responder
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self._rng.random() < self.failure_rate:
+            raise RuntimeError("fake model failure")
+        if self.responder is not None:
+            return self.responder(prompt)
+        first_line = prompt.strip().splitlines()[0] if prompt.strip() else ""
+        return f"[fake summary] {first_line[:160]}"
+
+# ----------- Circuit Breaker -----------
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; after `reset_timeout` seconds one trial call is let through.
+
+    A successful trial closes the breaker, a failed one re-opens it for another `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def release_trial(self):
+        """Give up a trial that reached no verdict (it never got a slot, or was cancelled)."""
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.trial_in_flight or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self.trial_in_flight:
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+        self.trial_in_flight = False
+
+# ----------- Client -----------
+class LLMClient:
+    """Concurrency-limited, deadline-bounded calls to `model` with async backoff and a circuit breaker.
+
+    At most `max_concurrency` calls run at once; callers waiting for a slot count
+    against their deadline. Failed attempts back off with `asyncio.sleep`, so waiting
+    costs no threads. Each attempt is cut off at the time left before the deadline.
+    """
+
+    def __init__(self, model, *, max_concurrency: int = 8, max_attempts: int = 3, base_delay: float = 1.0,
+                 max_delay: float = 8.0, deadline: float = 20.0, breaker: Optional[CircuitBreaker] = None):
+        self.model = model
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.short_circuited = 0
+
+    async def generate(self, prompt: str, deadline: Optional[float] = None) -> str:
+        """Text for `prompt`; raises CircuitOpen or LLMUnavailable instead of waiting past the deadline."""
+        expires_at = time.monotonic() + (deadline or self.deadline)
+        last_error = None
+        for attempt in range(1, self.max_attempts + 1):
+            if not self.breaker.allow():
+                self.short_circuited += 1
+                raise CircuitOpen(f"circuit open after {self.breaker.failures} consecutive failures")
+            trial = self.breaker.trial_in_flight  # only the half-open trial call sets it
+            try:
+                return await self._attempt(prompt, expires_at)
+            except LLMUnavailable:
+                # Never got a slot: says nothing about the model's health
+                self.timeouts += 1
+                if trial:
+                    self.breaker.release_trial()
+                raise
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                last_error = "deadline exceeded"
+                self.breaker.record_failure()
+                break
+            except Exception as e:
+                self.failures += 1
+                last_error = repr(e)
+                self.breaker.record_failure()
+            except BaseException:
+                # Cancelled (timeout, client disconnect): a stuck trial flag would keep the breaker open for good
+                if trial:
+                    self.breaker.release_trial()
+                raise
+
+            delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+            if attempt == self.max_attempts or time.monotonic() + delay >= expires_at:
+                break
+            logger.warning(f"[Attempt {attempt}] LLM call failed: {last_error}. Retrying in {delay:.2f}s...")
+            await asyncio.sleep(delay)
+        raise LLMUnavailable(f"LLM call failed: {last_error}")
+
+    async def _attempt(self, prompt: str, expires_at: float) -> str:
+        started = False
+
+        async def call():
+            nonlocal started
+            async with self._semaphore:
+                started = True
+                self.in_flight += 1
+                self.calls += 1
+                try:
+                    return await self.model.generate(prompt)
+                finally:
+                    self.in_flight -= 1
+
+        # Waiting for a slot and the call itself share one timeout
+        try:
+            text = await asyncio.wait_for(call(), max(0.0, expires_at - time.monotonic()))
+        except asyncio.TimeoutError:
+            if not started:
+                raise LLMUnavailable("deadline exceeded waiting for a free LLM slot")
+            raise
+        self.breaker.record_success()
+        return text
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model.model_name,
+            "breaker": self.breaker.state,
+            "breaker_opened": self.breaker.times_opened,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "short_circuited": self.short_circuited,
+        }
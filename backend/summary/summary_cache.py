@@ -0,0 +1,98 @@
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# ----------- Event Signature -----------
+def _norm(value: str) -> str:
+    return re.sub(r"\s+", " ", str(value)).strip().lower()
+
+def _epoch(timestamp: str) -> float:
+    try:
+        parsed = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return time.time()
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def event_signature(event, bucket_seconds: float) -> tuple:
+    """Events that should read the same: same threats, level, severity and place within one time bucket."""
+    threat_types = ",".join(sorted(_norm(t) for t in str(event.threat_type).split(",") if t.strip()))
+    return (
+        threat_types,
+        _norm(event.threat_level),
+        _norm(event.severity),
+        _norm(event.location),
+        int(_epoch(event.timestamp) // bucket_seconds),
+    )
+
+# ----------- Cache -----------
+class SummaryCache:
+    """LRU + TTL cache of summaries keyed by event signature, with in-flight coalescing.
+
+    A miss runs `factory()` in its own task, and concurrent lookups for the same
+    signature await that task instead of starting their own. Every caller, the first
+    included, waits through asyncio.shield, so a cancelled caller does not cancel the
+    generation the others are waiting on. `cacheable(result)` decides whether a finished
+    result is stored (fallback summaries are not, so an outage does not outlive itself).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0, cacheable=lambda result: True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cacheable = cacheable
+        self._entries = OrderedDict()  # signature -> (result, expires_at)
+        self._in_flight = {}  # signature -> Task
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    async def get_or_create(self, signature, factory):
+        """(result, status) where status is "hit", "coalesced" or "miss"; `factory()` is awaited on a miss."""
+        entry = self._entries.get(signature)
+        if entry is not None:
+            if entry[1] > time.monotonic():
+                self._entries.move_to_end(signature)
+                self.hits += 1
+                return entry[0], "hit"
+            del self._entries[signature]
+
+        pending = self._in_flight.get(signature)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending), "coalesced"
+
+        self.misses += 1
+        task = asyncio.ensure_future(factory())
+        self._in_flight[signature] = task
+        task.add_done_callback(lambda done: self._finish(signature, done))
+        return await asyncio.shield(task), "miss"
+
+    def _finish(self, signature, task):
+        del self._in_flight[signature]
+        if task.cancelled() or task.exception() is not None:
+            return  # exception() also marks it retrieved when every waiter has gone
+        if self.cacheable(task.result()):
+            self._put(signature, task.result())
+
+    def _put(self, signature, result):
+        self._entries[signature] = (result, time.monotonic() + self.ttl)
+        self._entries.move_to_end(signature)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.coalesced + self.misses
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
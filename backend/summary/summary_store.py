@@ -0,0 +1,53 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import TIMESTAMP, Column, MetaData, Table, Text, Uuid
+from sqlalchemy.dialects import postgresql, sqlite
+
+# ----------- Table -----------
+# Core mirror of SQL_db/models.py's `summaries`; that module owns the PostgreSQL schema
+metadata = MetaData()
+
+summaries_table = Table(
+    "summaries", metadata,
+    Column("summary_id", Uuid, primary_key=True),
+    Column("summary_text", Text),
+    Column("generated_at", TIMESTAMP),
+    Column("model_used", Text),
+    Column("event_id", Uuid),
+    Column("source_event_id", Text),
+)
+
+# ----------- Row Mapping -----------
+def _event_uuid(event_id: str) -> Optional[uuid.UUID]:
+    # Combiner ids ("combined_1a2b3c4d") have no `events` row to point at; source_event_id keeps them
+    try:
+        return uuid.UUID(event_id)
+    except ValueError:
+        return None
+
+def summary_row(summary_obj: dict) -> dict:
+    """`summaries` row for a summary response; event_id is set only when eventId is an `events` UUID."""
+    return {
+        "summary_id": uuid.UUID(summary_obj["summary_id"]),
+        "summary_text": summary_obj["summary"],
+        "generated_at": datetime.fromisoformat(summary_obj["timestamp"].rstrip("Z")),
+        "model_used": summary_obj["model_used"],
+        "event_id": _event_uuid(summary_obj["event"]["eventId"]),
+        "source_event_id": summary_obj["event"]["eventId"],
+    }
+
+# ----------- Write -----------
+_DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+def write_batch(engine, summary_objs):
+    """One transaction and one executemany; no per-row refresh since the ids are generated here.
+
+    Rows whose summary_id is already stored are skipped, so a spill replay repeated after
+    a crash does not fail on its own earlier writes.
+    """
+    insert = _DIALECT_INSERTS.get(engine.dialect.name)
+    statement = summaries_table.insert() if insert is None else insert(summaries_table).on_conflict_do_nothing()
+    with engine.begin() as conn:
+        conn.execute(statement, [summary_row(obj) for obj in summary_objs])